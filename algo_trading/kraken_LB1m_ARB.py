@@ -1,23 +1,68 @@
 import os
 import time
 import json
+import logging
 import hmac
 import base64
 import hashlib
 import urllib.parse
-import urllib.request
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import websockets
 import asyncio
-import collections # <-- NEW IMPORT
+from numba import njit
 from decimal import Decimal, ROUND_DOWN, getcontext
-from dataclasses import dataclass
-from typing import Dict, Any, List, Optional, Deque # <-- NEW IMPORT
+from dataclasses import dataclass, fields
+from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
+from kraken_log import start_queue_logging
+
+# orjson for the WebSocket hot path when available; stdlib json otherwise
+try:
+    import orjson
+    _loads = orjson.loads
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    _loads = json.loads
+    _dumps = json.dumps
+
+# WS frames decode straight into a typed struct with msgspec when available; unknown keys are dropped
+try:
+    import msgspec
+
+    class WSMsg(msgspec.Struct):
+        channel: Optional[str] = None
+        method: Optional[str] = None
+        type: Optional[str] = None
+        data: Optional[list] = None
+        error: Any = None
+        success: Optional[bool] = None
+        result: Optional[dict] = None
+
+    _decode_ws = msgspec.json.Decoder(WSMsg).decode
+except ImportError:
+    @dataclass
+    class WSMsg:
+        channel: Optional[str] = None
+        method: Optional[str] = None
+        type: Optional[str] = None
+        data: Optional[list] = None
+        error: Any = None
+        success: Optional[bool] = None
+        result: Optional[dict] = None
+
+    _WS_FIELDS = frozenset(f.name for f in fields(WSMsg))
+
+    def _decode_ws(message: str) -> WSMsg:
+        return WSMsg(**{k: v for k, v in _loads(message).items() if k in _WS_FIELDS})
 
 # Higher precision math for crypto sizing
 getcontext().prec = 28
 
 load_dotenv()
+logger = logging.getLogger("kraken_breakout")
 API_KEY = os.getenv("KRAKEN_API_KEY")
 SECRET_KEY = os.getenv("KRAKEN_API_SECRET")  # base64 string from Kraken
 
@@ -28,6 +73,11 @@ OHLC_PATH = "/0/public/OHLC"
 PAIRS_PATH = "/0/public/AssetPairs"
 BALANCE_PATH = "/0/private/Balance"
 TICKER_PATH = "/0/public/Ticker"
+BPS = 10_000  # basis points per 1.0
+BALANCE_CACHE_TTL_S = 60  # how long a Balance result stands in for a fresh call on the sell path
+HEARTBEAT_LOG_EVERY = 30  # Kraken heartbeats arrive about once a second; log status every N of them
+# Heartbeats carry nothing but this, so they are recognised without parsing the frame
+WS_HEARTBEAT_TAG = '"channel":"heartbeat"'
 
 
 # =============== HTTP helpers (Kept for initial pair config) ===============
@@ -35,14 +85,33 @@ TICKER_PATH = "/0/public/Ticker"
 def _nonce_ms() -> str:
     return str(int(time.time() * 1000))
 
-def _kraken_sign(secret_b64: str, path: str, nonce: str, postdata_str: str) -> str:
-    if not secret_b64:
+# Decoded once; signing runs on every private call
+_SECRET_BYTES = base64.b64decode(SECRET_KEY) if SECRET_KEY else None
+_PATH_BYTES = {path: path.encode() for path in (ADD_ORDER_PATH, BALANCE_PATH)}
+# Fixed private-call headers; each request copies this and adds its API-Sign
+_PRIVATE_HEADERS = {
+    "API-Key": API_KEY or "",
+    "Content-Type": "application/x-www-form-urlencoded",
+}
+
+def _kraken_sign(path: str, nonce: str, postdata_str: str) -> str:
+    if not _SECRET_BYTES:
         raise ValueError("KRAKEN_API_SECRET missing.")
-    sha = hashlib.sha256((nonce + postdata_str).encode()).digest()
-    msg = path.encode() + sha
-    secret = base64.b64decode(secret_b64)
-    sig = hmac.new(secret, msg, hashlib.sha512).digest()
-    return base64.b64encode(sig).decode()
+    # Feed the pieces straight into the digests instead of concatenating them first
+    sha = hashlib.sha256(nonce.encode())
+    sha.update(postdata_str.encode())
+    mac = hmac.new(_SECRET_BYTES, _PATH_BYTES.get(path) or path.encode(), hashlib.sha512)
+    mac.update(sha.digest())
+    return base64.b64encode(mac.digest()).decode()
+
+# One pooled keep-alive session for every REST call; Retry skips POST, so AddOrder is never resent
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": "kraken-breakout-bot/1.0"})
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504]),
+))
 
 def _http_post(path: str, fields: Dict[str, str]) -> Dict[str, Any]:
     if not API_KEY or not SECRET_KEY:
@@ -53,28 +122,17 @@ def _http_post(path: str, fields: Dict[str, str]) -> Dict[str, Any]:
         fields["nonce"] = _nonce_ms()
 
     postdata = urllib.parse.urlencode(fields)
-    headers = {
-        "API-Key": API_KEY,
-        "API-Sign": _kraken_sign(SECRET_KEY, path, fields["nonce"], postdata),
-        "Content-Type": "application/x-www-form-urlencoded",
-        "User-Agent": "kraken-breakout-bot/1.0",
-    }
-    req = urllib.request.Request(
-        url=BASE_URL + path,
-        data=postdata.encode(),
-        headers=headers,
-        method="POST",
-    )
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        data = json.loads(resp.read().decode())
-    return data
+    headers = _PRIVATE_HEADERS.copy()
+    headers["API-Sign"] = _kraken_sign(path, fields["nonce"], postdata)
+    # Send the exact string that was signed
+    resp = _SESSION.post(BASE_URL + path, data=postdata, headers=headers, timeout=15)
+    resp.raise_for_status()
+    return _loads(resp.content)
 
 def _http_get(url: str, params: Dict[str, str]) -> Dict[str, Any]:
-    qs = urllib.parse.urlencode(params)
-    full = f"{url}?{qs}" if qs else url
-    req = urllib.request.Request(full, method="GET", headers={"User-Agent": "kraken-breakout-bot/1.0"})
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        return json.loads(resp.read().decode())
+    resp = _SESSION.get(url, params=params, timeout=15)
+    resp.raise_for_status()
+    return _loads(resp.content)
 
 # =============== Kraken client (Modified to remove polling) ===============
 
@@ -85,6 +143,7 @@ class PairRules:
     ordermin: Decimal
     costmin: Optional[Decimal]
     lot_decimals: int
+    price_decimals: int  # pair_decimals; tick_size == 10^-price_decimals
     tick_size: Decimal
     quote: str
     base: str
@@ -95,9 +154,25 @@ class KrakenClient:
         self.symbol_in = symbol.replace("/", "")
         self.interval = interval
         self.rules = self._fetch_pair_rules(self.symbol_in)
-        # Use a Deque to store the last N candles for the strategy
-        # Max length of 3: two for the strategy logic, one to handle the current incomplete candle
-        self.candles: Deque[Dict[str, Decimal]] = collections.deque(maxlen=3) 
+        # Sizing constants, fixed for the life of the client
+        self._lot_step = Decimal("1").scaleb(-self.rules.lot_decimals)
+        # Ticks per 1.0 of quote, so prices can be floored as integers
+        self._tick_scale = 10 ** self.rules.price_decimals
+        # Last known base balance and when it was fetched (time.monotonic())
+        self._cached_base_balance: Optional[Decimal] = None
+        self._base_balance_at = 0.0
+        self._has_ordermin = self.rules.ordermin > 0
+        self._has_costmin = self.rules.costmin is not None and self.rules.costmin > 0
+        # AddOrder fields that never change for this bot; each order copies this and adds the rest
+        self._order_template = {
+            "ordertype": "limit",
+            "pair": self.rules.altname,               # Kraken likes altname for trading
+            "oflags": "post",                         # post-only
+            "timeinforce": "GTD",
+        }
+        # Only the latest OHLC state is ever read, so keep one slot and overwrite it in place
+        # Candle prices are floats: they are only compared, and become Decimal at order placement
+        self._latest_candle: Optional[Dict[str, float]] = None
 
     def _fetch_pair_rules(self, altname_guess: str) -> PairRules:
         # ... (unchanged logic for fetching pair rules) ...
@@ -113,7 +188,7 @@ class KrakenClient:
                 raise ValueError(f"Could not resolve Kraken pair for {altname_guess}")
             key, pairinfo = candidates[0]
         else:
-            key, pairinfo = list(result.items())[0]
+            key, pairinfo = next(iter(result.items()))
 
         altname = pairinfo.get("altname")
         lot_decimals = int(pairinfo.get("lot_decimals", 8))
@@ -136,6 +211,7 @@ class KrakenClient:
             ordermin=ordermin if ordermin > 0 else Decimal("0"),
             costmin=costmin,
             lot_decimals=lot_decimals,
+            price_decimals=tick_decimals,
             tick_size=tick_size,
             quote=quote,
             base=base,
@@ -144,46 +220,36 @@ class KrakenClient:
 
     def update_candles(self, new_candles: List[Dict[str, Any]]):
         """Called by the WebSocket client to update the internal candle history."""
-        # The WebSocket sends an array of candles. We only care about the latest two *complete* ones.
-        for raw_c in new_candles:
-            candle_obj = {
-                "open": Decimal(str(raw_c["open"])),
-                "high": Decimal(str(raw_c["high"])),
-                "low":  Decimal(str(raw_c["low"])),
-                "close":Decimal(str(raw_c["close"])),
-                "volume":Decimal(str(raw_c["volume"])),
-                "time": int(time.time()), # WSv2 uses interval_begin, but we just need a timestamp
-                # Note: The WS data contains 'interval', 'type', and 'interval_begin', which can be used to distinguish 
-                # between a *complete* candle (when the interval changes) and an *incomplete* update.
-                # For simplicity, we treat every update as a potential new candle close for the strategy.
-            }
-            # For a 1m breakout strategy, the 'update' message is the new close of the candle.
-            # We must replace the last element (the incomplete candle) or append a new one.
-            # A more robust solution would check interval_begin to see if it's a new candle or an update to the current one.
-            # Simplistic approach: Assume the strategy cares about the *latest* OHLC state.
-            if len(self.candles) > 0:
-                self.candles.pop()
-            self.candles.append(candle_obj)
+        # The WebSocket sends an array of candles; each one overwrote the previous, so only the last survives.
+        # Note: The WS data contains 'interval', 'type', and 'interval_begin', which can be used to distinguish 
+        # between a *complete* candle (when the interval changes) and an *incomplete* update.
+        # For simplicity, we treat every update as a potential new candle close for the strategy.
+        # Simplistic approach: Assume the strategy cares about the *latest* OHLC state.
+        # open and volume are never read, so they are not converted.
+        raw_c = new_candles[-1]
+        c = self._latest_candle
+        if c is None:
+            c = self._latest_candle = {}
+        c["high"] = float(raw_c["high"])
+        c["low"] = float(raw_c["low"])
+        c["close"] = float(raw_c["close"])
+        c["time"] = int(time.time())  # WSv2 uses interval_begin, but we just need a timestamp
 
     # ---- sizing helpers ----
     def _round_volume(self, vol: Decimal) -> Decimal:
-        # lot step is 10^(-lot_decimals)
-        step = Decimal("1").scaleb(-self.rules.lot_decimals)
-        # round DOWN to the permitted step
-        return (vol // step) * step
+        # round DOWN to the permitted step (10^(-lot_decimals))
+        return (vol // self._lot_step) * self._lot_step
 
     def _min_volume_for_price(self, price: Decimal) -> Decimal:
         """
         Compute the minimum volume that satisfies both ordermin (base) and costmin (quote),
         rounded to lot decimals.
         """
-        candidates = [self.rules.ordermin] if self.rules.ordermin and self.rules.ordermin > 0 else []
-        if self.rules.costmin and self.rules.costmin > 0 and price > 0:
-            needed = (self.rules.costmin / price)
-            candidates.append(needed)
-        if not candidates:
-            return self._round_volume(Decimal("0"))
-        vol = max(candidates)
+        vol = self.rules.ordermin if self._has_ordermin else Decimal("0")
+        if self._has_costmin and price > 0:
+            needed = self.rules.costmin / price
+            if needed > vol:
+                vol = needed
         return self._round_volume(vol)
 
     def place_post_only_limit(self, side: str, volume: Decimal, price: Decimal, expire_s: int = 5) -> Dict[str, Any]:
@@ -193,17 +259,13 @@ class KrakenClient:
         if min_vol > 0 and volume < min_vol:
             volume = min_vol
 
-        fields = {
-            "nonce": _nonce_ms(),
-            "ordertype": "limit",
-            "type": side.lower(),
-            "volume": f"{volume.normalize()}",
-            "pair": self.rules.altname,               # Kraken likes altname for trading
-            "price": f"{price.normalize()}",
-            "oflags": "post",                         # post-only
-            "timeinforce": "GTD",
-            "expiretm": f"+{expire_s}",
-        }
+        fields = self._order_template.copy()
+        fields["nonce"] = _nonce_ms()
+        fields["type"] = side.lower()
+        # Fixed-point formatting; normalize() would send qty 70 as "7E+1"
+        fields["volume"] = f"{volume:f}"
+        fields["price"] = f"{price:f}"
+        fields["expiretm"] = f"+{expire_s}"
         resp = _http_post(ADD_ORDER_PATH, fields)
         return resp
 
@@ -221,10 +283,30 @@ class KrakenClient:
             result = resp.get("result", {})
             # Kraken uses asset codes like "ARB", "USD", etc.
             raw = result.get(self.rules.base, "0")
-            return Decimal(str(raw))
+            return Decimal(raw)  # REST balances are already strings
         except Exception:
             return Decimal("0")
 
+    def refresh_base_balance(self) -> Decimal:
+        """Fetch the base balance and reset the cache with it."""
+        self._cached_base_balance = self.get_available_base_balance()
+        self._base_balance_at = time.monotonic()
+        return self._cached_base_balance
+
+    def cached_base_balance(self) -> Decimal:
+        """Base balance from cache, refreshed only when older than BALANCE_CACHE_TTL_S."""
+        if self._cached_base_balance is None or time.monotonic() - self._base_balance_at > BALANCE_CACHE_TTL_S:
+            return self.refresh_base_balance()
+        return self._cached_base_balance
+
+    def adjust_cached_base_balance(self, delta: Decimal):
+        """
+        Move the cached balance by the volume the strategy's position just changed by, so a sell
+        doesn't re-query Balance. TTL expiry and "Insufficient funds" still refresh it for real.
+        """
+        if self._cached_base_balance is not None:
+            self._cached_base_balance = max(self._cached_base_balance + delta, Decimal("0"))
+
     def get_best_bid_ask(self) -> Optional[Dict[str, Decimal]]:
         """Fetch best bid/ask from public Ticker for the current pair."""
         try:
@@ -236,9 +318,10 @@ class KrakenClient:
             # result is a map of pair-> { a: [ask,...], b:[bid,...] }
             if not result:
                 return None
-            _, payload = list(result.items())[0]
-            ask = Decimal(str(payload["a"][0]))
-            bid = Decimal(str(payload["b"][0]))
+            payload = next(iter(result.values()))
+            # Ticker prices come back as strings, so Decimal takes them as-is
+            ask = Decimal(payload["a"][0])
+            bid = Decimal(payload["b"][0])
             return {"bid": bid, "ask": ask}
         except Exception:
             return None
@@ -246,9 +329,12 @@ class KrakenClient:
 # =============== WebSocket Client (NEW) ===============
 
 class OHLCSocketClient:
-    def __init__(self, client: KrakenClient, strategy: Optional["CandleBreakoutStrategy"] = None):
+    def __init__(self, client: KrakenClient, strategy: Optional["CandleBreakoutStrategy"] = None,
+                 new_candle_evt: Optional[asyncio.Event] = None):
         self.client = client
         self.strategy = strategy
+        # Set after every OHLC update so the strategy loop wakes immediately instead of polling
+        self.new_candle_evt = new_candle_evt
         self.ws_uri = KRAKEN_WS_URI
         self.symbol = client.rules.wsname  # Use "ARB/USD"
         self.interval = client.interval   # e.g., 1 minute
@@ -261,94 +347,141 @@ class OHLCSocketClient:
                 "snapshot": True,
             }
         }
+        # Serialized once; every reconnect resends the same frame
+        self._sub_payload = _dumps(self.subscription_msg)
         self.is_subscribed = False
+        self._heartbeats = 0
+
+    def _log_heartbeat(self):
+        """Log position size, latest close, and previous candle high/low every HEARTBEAT_LOG_EVERY heartbeats."""
+        self._heartbeats += 1
+        if self._heartbeats % HEARTBEAT_LOG_EVERY:
+            return
+        pos_str = "n/a"
+        prev_h_str = "n/a"
+        prev_l_str = "n/a"
+        last_close_str = "n/a"
+
+        if self.strategy is not None:
+            pos_str = f"{self.strategy.position_size}"
+            if self.strategy.prev_high is not None:
+                prev_h_str = f"{self.strategy.prev_high}"
+            if self.strategy.prev_low is not None:
+                prev_l_str = f"{self.strategy.prev_low}"
+
+        if self.client._latest_candle is not None:
+            last_close_str = f"{self.client._latest_candle['close']}"
+
+        logger.info("%s pos: %s | close: %s | prev H/L: %s/%s",
+                    self.symbol, pos_str, last_close_str, prev_h_str, prev_l_str)
+
+    @staticmethod
+    async def _pump(websocket, frames: asyncio.Queue):
+        """Producer: moves frames off the socket as they arrive; None marks the end of the stream."""
+        try:
+            async for message in websocket:
+                frames.put_nowait(message)
+        finally:
+            frames.put_nowait(None)
+
+    def _handle_frame(self, message: str):
+        # Handle heartbeat messages (most of the traffic on a quiet pair) before any parsing
+        if WS_HEARTBEAT_TAG in message:
+            self._log_heartbeat()
+            return
+
+        msg = _decode_ws(message)
+
+        logger.debug("[WS Message] %s", msg)
+
+        # Handle OHLC data update (both snapshot and ongoing updates use 'ohlc' channel)
+        if msg.channel == "ohlc":
+            msg_type = msg.type or "unknown"
+            logger.debug("Received OHLC %s message", msg_type)
+
+            # 1. Extract the list of candles from the 'data' key
+            raw_candles_list = msg.data
+
+            if raw_candles_list:
+                # 2. Pass the entire list to the main client's update function
+                self.client.update_candles(raw_candles_list) 
+                if self.new_candle_evt is not None:
+                    self.new_candle_evt.set()
+                logger.debug("Processed %d candle(s) from %s.", len(raw_candles_list), msg_type)
+            else:
+                logger.debug("Empty candle data in %s message", msg_type)
+            return
+
+        # Handle connection status messages
+        if msg.channel == "status":
+            logger.info("Connection status: %s", msg.type or "unknown")
+            return
+
+        # Handle subscription acknowledgement
+        if msg.method == "subscribe" and msg.success == True:
+            result = msg.result or {}
+            logger.info("Subscription confirmed for %s channel!", result.get("channel", "unknown"))
+            self.is_subscribed = True
+            return
+
+        # Handle errors
+        if msg.error:
+            logger.error("Kraken WebSocket Error: %s", msg.error)
+            raise Exception("WebSocket API Error")
 
     async def run(self):
         """Manages the connection and listens for OHLC data."""
         while True:
             try:
-                print(f"Connecting to Kraken WebSocket V2 for {self.symbol}...")
+                logger.info("Connecting to Kraken WebSocket V2 for %s...", self.symbol)
                 async with websockets.connect(self.ws_uri) as websocket:
                     # Send subscription message
-                    await websocket.send(json.dumps(self.subscription_msg))
-                    print(f"Sent OHLC subscription for {self.symbol}@{self.interval}m.")
-
-                    # Process incoming messages
-                    async for message in websocket:
-                        data = json.loads(message)
-
-                        print(f"[WS Message] {data}")
-                        
-                        # Handle connection status messages
-                        if data.get("channel") == "status":
-                            print(f"Connection status: {data.get('type', 'unknown')}")
-                            continue
-                            
-                        # Handle subscription acknowledgement
-                        if data.get("method") == "subscribe" and data.get("success") == True:
-                            result = data.get("result", {})
-                            print(f"Subscription confirmed for {result.get('channel', 'unknown')} channel!")
-                            self.is_subscribed = True
-                            continue
-                        
-                        # Handle heartbeat messages
-                        if data.get("channel") == "heartbeat":
-                            # Print position size, latest close, and previous candle high/low
-                            pos_str = "n/a"
-                            prev_h_str = "n/a"
-                            prev_l_str = "n/a"
-                            last_close_str = "n/a"
-
-                            if self.strategy is not None:
-                                pos_str = f"{self.strategy.position_size}"
-                                if self.strategy.prev_high is not None:
-                                    prev_h_str = f"{self.strategy.prev_high}"
-                                if self.strategy.prev_low is not None:
-                                    prev_l_str = f"{self.strategy.prev_low}"
-
-                            if len(self.client.candles) >= 1:
-                                try:
-                                    last_close_str = f"{self.client.candles[-1]['close']}"
-                                except Exception:
-                                    pass
-
-                            print(
-                                f"{self.symbol} pos: {pos_str} | "
-                                f"close: {last_close_str} | prev H/L: {prev_h_str}/{prev_l_str}"
-                            )
-                            continue
-                        
-                        # Handle OHLC data update (both snapshot and ongoing updates use 'ohlc' channel)
-                        if data.get("channel") == "ohlc":
-                            msg_type = data.get("type", "unknown")
-                            print(f"Received OHLC {msg_type} message")
-                            
-                            # 1. Extract the list of candles from the 'data' key
-                            raw_candles_list = data.get("data", []) 
-                            
-                            if raw_candles_list:
-                                # 2. Pass the entire list to the main client's update function
-                                self.client.update_candles(raw_candles_list) 
-                                print(f"Processed {len(raw_candles_list)} candle(s) from {msg_type}.")
-                            else:
-                                print(f"Empty candle data in {msg_type} message")
-                            
-                        # Handle errors
-                        if data.get("error"):
-                            print(f"Kraken WebSocket Error: {data['error']}")
-                            raise Exception("WebSocket API Error")
+                    await websocket.send(self._sub_payload)
+                    logger.info("Sent OHLC subscription for %s@%sm.", self.symbol, self.interval)
+
+                    # Process incoming messages: the pump task only drains the socket, this loop does the parsing
+                    frames: asyncio.Queue = asyncio.Queue()
+                    pump = asyncio.create_task(self._pump(websocket, frames))
+                    try:
+                        while (message := await frames.get()) is not None:
+                            self._handle_frame(message)
+                        # Socket closed: surface ConnectionClosedError (clean closes just reconnect)
+                        await pump
+                    finally:
+                        pump.cancel()
 
             except (websockets.ConnectionClosed, ConnectionRefusedError) as e:
-                print(f"WebSocket connection lost/refused. Retrying in 5 seconds... ({e})")
+                logger.warning("WebSocket connection lost/refused. Retrying in 5 seconds... (%s)", e)
                 self.is_subscribed = False
                 await asyncio.sleep(5)
             except Exception as e:
-                print(f"An unexpected error occurred in WebSocket client: {e}. Retrying in 10 seconds.")
+                logger.warning("An unexpected error occurred in WebSocket client: %s. Retrying in 10 seconds.", e)
                 self.is_subscribed = False
                 await asyncio.sleep(10)
 
 # =============== Strategy & Context (Modified for async) ===============
 
+HOLD, BUY, SELL = 0, 1, 2
+
+@njit("Tuple((int64, int64))(float64, float64, float64, float64, int64, int64)", cache=True)
+def _decide(close, prev_high, prev_low, position, buffer_bps, tick_scale):
+    """
+    Breakout decision for one candle: (HOLD/BUY/SELL, limit price in whole ticks).
+
+    BUY is buffered below close and SELL above it, floored to the tick. close is on the tick
+    grid, so it converts to ticks exactly and the buffer is applied in integer basis points.
+    """
+    if position == 0 and close > prev_high:
+        mul = BPS - buffer_bps
+        action = BUY
+    elif position > 0 and close < prev_low:
+        mul = BPS + buffer_bps
+        action = SELL
+    else:
+        return HOLD, 0
+    close_ticks = int(round(close * tick_scale))
+    return action, close_ticks * mul // BPS
+
 class CandleBreakoutStrategy:
     # ... (init and logic remains the same, but will be called differently) ...
     def __init__(self, client: KrakenClient, symbol: str, qty: Decimal = Decimal("1"), buffer_pct: Decimal = Decimal("0.02")):
@@ -356,12 +489,21 @@ class CandleBreakoutStrategy:
         self.symbol = symbol
         self.qty = qty
         self.buffer = buffer_pct
+        # Integer inputs for the _decide kernel
+        self.buffer_bps = int(buffer_pct * BPS)
+        self._tick = client.rules.tick_size
+        self._price_decimals = client.rules.price_decimals
+        self._tick_scale = client._tick_scale
         self.position_size = Decimal("0")
-        self.prev_high: Optional[Decimal] = None
-        self.prev_low: Optional[Decimal] = None
+        self.prev_high: Optional[float] = None
+        self.prev_low: Optional[float] = None
         self.last_candle_time: Optional[int] = None # NEW: To track when a new candle is complete
 
-    def on_new_candle(self, current: Dict[str, Decimal]):
+    async def on_new_candle(self, current: Dict[str, float]):
+        """
+        Runs on the event loop; the blocking REST calls (orders, ticker, balance) go
+        through asyncio.to_thread so the WebSocket keeps reading while they are in flight.
+        """
         # Check if the candle time has actually rolled over (basic check)
         if self.last_candle_time is not None and self.last_candle_time >= current.get("time", 0):
             # This is just an update to the *current* candle, not a completed one.
@@ -376,55 +518,67 @@ class CandleBreakoutStrategy:
             return
 
         close = current["close"]
-        long_entry = (close > self.prev_high) and (self.position_size == 0)
-        long_exit  = (close < self.prev_low) and (self.position_size > 0)
+        action, price_ticks = _decide(close, self.prev_high, self.prev_low, float(self.position_size),
+                                      self.buffer_bps, self._tick_scale)
 
         # For post-only: BUY below market; SELL above market to avoid immediate match
-        if long_entry:
+        if action == BUY:
             # Initial target below last close
-            tick = self.client.rules.tick_size
-            buy_price = (close * (Decimal("1.0") - self.buffer)).quantize(tick, rounding=ROUND_DOWN)
+            # Decimal only from here on: the order price has to land exactly on a tick
+            buy_price = Decimal(price_ticks).scaleb(-self._price_decimals)
             attempts = 0
             while attempts < 3:
-                resp = self.client.place_post_only_limit("buy", self.qty, buy_price, expire_s=5)
-                print("BUY resp:", json.dumps(resp, indent=2))
+                resp = await asyncio.to_thread(self.client.place_post_only_limit, "buy", self.qty, buy_price, expire_s=5)
+                logger.debug("BUY resp: %s", resp)
                 if not resp.get("error"):
+                    self.client.adjust_cached_base_balance(self.qty - self.position_size)
                     self.position_size = self.qty
                     break
                 # Refresh from ticker and move to maker-safe level at bid - 1 tick
-                ba = self.client.get_best_bid_ask()
+                ba = await asyncio.to_thread(self.client.get_best_bid_ask)
                 if not ba:
                     break
-                buy_price = (ba["bid"] - tick).quantize(tick, rounding=ROUND_DOWN)
+                buy_price = (ba["bid"] - self._tick).quantize(self._tick, rounding=ROUND_DOWN)
                 attempts += 1
 
-        if long_exit:
-            tick = self.client.rules.tick_size
-            sell_price = (close * (Decimal("1.0") + self.buffer)).quantize(tick, rounding=ROUND_DOWN)
-            # Use available balance to avoid insufficient funds on sell
-            available_base = self.client.get_available_base_balance()
+        elif action == SELL:
+            sell_price = Decimal(price_ticks).scaleb(-self._price_decimals)
+            # Use available balance to avoid insufficient funds on sell; the cache tracks the
+            # filled volume the local position records, so this is normally a dict read
+            available_base = await asyncio.to_thread(self.client.cached_base_balance)
+            if available_base <= 0:
+                # A stale or failed lookup should not skip an exit; confirm with a fresh call
+                available_base = await asyncio.to_thread(self.client.refresh_base_balance)
             sell_volume = min(self.position_size, available_base) if available_base > 0 else Decimal("0")
             if sell_volume <= 0:
-                print(f"Skip SELL: no available {self.client.rules.base} balance")
+                logger.info("Skip SELL: no available %s balance", self.client.rules.base)
                 return
             attempts = 0
             while attempts < 3:
-                resp = self.client.place_post_only_limit("sell", sell_volume, sell_price, expire_s=5)
-                print("SELL resp:", json.dumps(resp, indent=2))
+                resp = await asyncio.to_thread(self.client.place_post_only_limit, "sell", sell_volume, sell_price, expire_s=5)
+                logger.debug("SELL resp: %s", resp)
                 if not resp.get("error"):
                     self.position_size -= sell_volume
+                    self.client.adjust_cached_base_balance(-sell_volume)
                     break
+                if any("Insufficient funds" in err for err in resp["error"]):
+                    # Cache drifted from the exchange; resize from a fresh balance
+                    available_base = await asyncio.to_thread(self.client.refresh_base_balance)
+                    sell_volume = min(self.position_size, available_base)
+                    if sell_volume <= 0:
+                        break
                 # Refresh from ticker and move to maker-safe level at ask + 1 tick
-                ba = self.client.get_best_bid_ask()
+                ba = await asyncio.to_thread(self.client.get_best_bid_ask)
                 if not ba:
                     break
-                sell_price = (ba["ask"] + tick).quantize(tick, rounding=ROUND_DOWN)
+                sell_price = (ba["ask"] + self._tick).quantize(self._tick, rounding=ROUND_DOWN)
                 attempts += 1
 
         # Roll previous candle levels
         self.prev_high = current["high"]
         self.prev_low  = current["low"]
-        print(f"[{self.symbol}] Close: {close} | New Prev H/L: {self.prev_high}/{self.prev_low} | Pos: {self.position_size}")
+        logger.debug("[%s] Close: %s | New Prev H/L: %s/%s | Pos: %s",
+                     self.symbol, close, self.prev_high, self.prev_low, self.position_size)
 
 
 class TradingContext:
@@ -432,46 +586,45 @@ class TradingContext:
         self.client = client
         self.strategy = strategy
         self.symbol = symbol
-        self.ws_client = OHLCSocketClient(client, strategy)
+        self._new_candle_evt = asyncio.Event()
+        self.ws_client = OHLCSocketClient(client, strategy, self._new_candle_evt)
 
     async def run(self):
         """Main entry point, running the WS client and strategy loop concurrently."""
-        print("Starting crypto trading loop (WS candles)...")
+        logger.info("Starting crypto trading loop (WS candles)...")
         # Sync local position with exchange balance at startup
         try:
-            available_base = self.client.get_available_base_balance()
+            available_base = await asyncio.to_thread(self.client.refresh_base_balance)
             if available_base > 0:
                 self.strategy.position_size = available_base
-                print(f"Synced position from exchange: {self.symbol} base balance = {available_base}")
+                logger.info("Synced position from exchange: %s base balance = %s", self.symbol, available_base)
             else:
-                print(f"No base balance detected for {self.symbol.split('USD')[0]}; starting flat")
+                logger.info("No base balance detected for %s; starting flat", self.symbol.split("USD")[0])
         except Exception as e:
-            print(f"Could not sync starting position: {e}")
+            logger.warning("Could not sync starting position: %s", e)
         # Run the WebSocket client in the background
         ws_task = asyncio.create_task(self.ws_client.run())
 
-        # The main strategy loop runs independently, checking for new data
+        # The main strategy loop sleeps until the WS client signals an OHLC update
+        logger.info("Waiting for WS connection and initial candle data...")
         while True:
-            # Wait for the WebSocket client to be active and have enough data
-            if self.ws_client.is_subscribed and len(self.client.candles) >= 1:
-                # The strategy only needs the latest candle to determine the breakout
-                last_candle = self.client.candles[-1]
-                
-                current = {
-                    "high": last_candle["high"],
-                    "low": last_candle["low"],
-                    "close": last_candle["close"],
-                    "time": last_candle["time"],
-                }
-
-                # IMPORTANT: Run the strategy logic based on the latest OHLC update
-                self.strategy.on_new_candle(current)
-            else:
-                print("Waiting for WS connection and initial candle data...")
-            
-            # Since the WS provides data instantly, we don't need a heavy poll_seconds anymore.
-            # A short sleep is good practice to yield control and prevent a tight loop.
-            await asyncio.sleep(0.5)
+            await self._new_candle_evt.wait()
+            # Clear before reading, so an update landing while the strategy runs wakes us again
+            self._new_candle_evt.clear()
+            last_candle = self.client._latest_candle
+            if not (self.ws_client.is_subscribed and last_candle is not None):
+                continue
+            # The strategy only needs the latest candle to determine the breakout;
+            # copy it, since the WS client keeps overwriting the slot while we await orders
+            current = {
+                "high": last_candle["high"],
+                "low": last_candle["low"],
+                "close": last_candle["close"],
+                "time": last_candle["time"],
+            }
+
+            # IMPORTANT: Run the strategy logic based on the latest OHLC update
+            await self.strategy.on_new_candle(current)
 
 # =============== Main (Modified for async) ===============
 
@@ -479,6 +632,8 @@ if __name__ == "__main__":
     if not API_KEY or not SECRET_KEY:
         raise SystemExit("Set KRAKEN_API_KEY and KRAKEN_API_SECRET in your environment/.env")
 
+    log_listener = start_queue_logging()
+
     SYMBOL = "ARBUSD"
     OHLC_INTERVAL_MINS = 1 # The interval the strategy is designed for
 
@@ -490,4 +645,6 @@ if __name__ == "__main__":
     try:
         asyncio.run(ctx.run())
     except KeyboardInterrupt:
-        print("\nClient terminated by user.")
\ No newline at end of file
+        print("\nClient terminated by user.")
+    finally:
+        log_listener.stop()
\ No newline at end of file
@@ -1,27 +1,50 @@
 """
 Kraken Candle-Breakout Bot (1m)
-- Fetches 1m OHLC from Kraken public API
+- Streams 1m OHLC from Kraken's v2 WebSocket, reconnecting with backoff
 - Places post-only GTD 5s limit orders on breakout
 - Auto-adjusts volume to satisfy ordermin, costmin, and lot_decimals
 """
 
 import os
-import math, time
+import functools
+import time
 import json
+import logging
 import hmac
 import base64
 import hashlib
 import urllib.parse
-import urllib.request
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from numba import njit
+import requests
+import websockets
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from decimal import Decimal, ROUND_DOWN, getcontext
 from dataclasses import dataclass
 from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
+from kraken_pairs_cache import cached_pair_rules
+from kraken_log import start_queue_logging
+
+# orjson when available (parses bytes directly); stdlib json otherwise
+try:
+    import orjson
+    _loads = orjson.loads
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    _loads = json.loads
+    _dumps = json.dumps
 
 # Higher precision math for crypto sizing
 getcontext().prec = 28
 
 load_dotenv()
+logger = logging.getLogger("kraken_breakout")
 API_KEY = os.getenv("KRAKEN_API_KEY")
 SECRET_KEY = os.getenv("KRAKEN_API_SECRET")  # base64 string from Kraken
 
@@ -33,53 +56,242 @@ TICKER_PATH = "/0/public/Ticker"
 OPEN_ORDERS_PATH = "/0/private/OpenOrders"
 QUERY_ORDERS_PATH = "/0/private/QueryOrders"
 CANCEL_ORDER_PATH = "/0/private/CancelOrder"
+WS_TOKEN_PATH = "/0/private/GetWebSocketsToken"
+KRAKEN_WS_URI = "wss://ws.kraken.com/v2"
+KRAKEN_WS_AUTH_URI = "wss://ws-auth.kraken.com/v2"
+WS_BACKOFF_MAX_S = 30
+# QueryOrders cadence while a maker rests without the executions feed; each poll costs 1 on
+# Kraken's private API counter (starter tier: 15 max, decaying ~0.33/s), so ~4 per 2s TTL
+MAKER_POLL_S = 0.5
+BOOK_DEPTH = 10
+BOOK_STALE_S = 2.0  # book feed silent longer than this -> Ticker over REST
+BPS = 10_000  # basis points per 1.0
+# Shared Decimal constants so hot paths don't re-parse literals
+_ZERO = Decimal(0)
+_ONE = Decimal(1)
 
 
 # =============== HTTP helpers ===============
 
-def _nonce_ms() -> str:
-    return str(int(time.time() * 1000))
+# Kraken wants nonces increasing per API key, and the feed threads sign calls too: track the
+# wall clock in ms under a lock, bumping by 1 only within the same ms
+_NONCE_LOCK = threading.Lock()
+_last_nonce = 0
 
-def _kraken_sign(secret_b64: str, path: str, nonce: str, postdata_str: str) -> str:
-    if not secret_b64:
+def _nonce_ms() -> str:
+    global _last_nonce
+    with _NONCE_LOCK:
+        _last_nonce = max(_last_nonce + 1, time.time_ns() // 1_000_000)
+        return str(_last_nonce)
+
+# Decoded once; signing runs on every private call
+_SECRET_BYTES = base64.b64decode(SECRET_KEY) if SECRET_KEY else None
+_PATH_BYTES = {
+    path: path.encode()
+    for path in (ADD_ORDER_PATH, OPEN_ORDERS_PATH, QUERY_ORDERS_PATH, CANCEL_ORDER_PATH, WS_TOKEN_PATH)
+}
+
+def _kraken_sign(path: bytes, nonce: str, postdata: bytes) -> str:
+    if not _SECRET_BYTES:
         raise ValueError("KRAKEN_API_SECRET missing.")
-    sha = hashlib.sha256((nonce + postdata_str).encode()).digest()
-    msg = path.encode() + sha
-    secret = base64.b64decode(secret_b64)
-    sig = hmac.new(secret, msg, hashlib.sha512).digest()
-    return base64.b64encode(sig).decode()
+    msg = path + hashlib.sha256(nonce.encode() + postdata).digest()
+    # hmac.digest is the one-shot C path; no HMAC object is built
+    return base64.b64encode(hmac.digest(_SECRET_BYTES, msg, "sha512")).decode()
+
+# One pooled keep-alive session for every REST call; Retry skips POST, so AddOrder is never resent
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": "kraken-breakout-bot/1.0"})
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504]),
+))
 
 def _http_post(path: str, fields: Dict[str, str]) -> Dict[str, Any]:
-    if not API_KEY or not SECRET_KEY:
-        raise ValueError("Missing KRAKEN_API_KEY or KRAKEN_API_SECRET.")
-
     # Ensure nonce
     if "nonce" not in fields:
         fields["nonce"] = _nonce_ms()
 
-    postdata = urllib.parse.urlencode(fields)
+    return _http_post_encoded(path, fields["nonce"], urllib.parse.urlencode(fields).encode())
+
+def _http_post_encoded(path: str, nonce: str, postdata: bytes) -> Dict[str, Any]:
+    """POST an already-urlencoded body; postdata must carry the same nonce."""
+    if not API_KEY or not SECRET_KEY:
+        raise ValueError("Missing KRAKEN_API_KEY or KRAKEN_API_SECRET.")
+
     headers = {
         "API-Key": API_KEY,
-        "API-Sign": _kraken_sign(SECRET_KEY, path, fields["nonce"], postdata),
+        "API-Sign": _kraken_sign(_PATH_BYTES.get(path) or path.encode(), nonce, postdata),
         "Content-Type": "application/x-www-form-urlencoded",
-        "User-Agent": "kraken-breakout-bot/1.0",
     }
-    req = urllib.request.Request(
-        url=BASE_URL + path,
-        data=postdata.encode(),
-        headers=headers,
-        method="POST",
-    )
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        data = json.loads(resp.read().decode())
-    return data
+    # Send the exact string that was signed
+    resp = _SESSION.post(BASE_URL + path, data=postdata, headers=headers, timeout=15)
+    resp.raise_for_status()
+    return _loads(resp.content)
 
 def _http_get(url: str, params: Dict[str, str]) -> Dict[str, Any]:
-    qs = urllib.parse.urlencode(params)
-    full = f"{url}?{qs}" if qs else url
-    req = urllib.request.Request(full, method="GET", headers={"User-Agent": "kraken-breakout-bot/1.0"})
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        return json.loads(resp.read().decode())
+    resp = _SESSION.get(url, params=params, timeout=15)
+    resp.raise_for_status()
+    return _loads(resp.content)
+
+# Cancel and taker legs of place_maker_then_taker go out side by side
+_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="kraken-order")
+
+# =============== Order status feed ===============
+
+_ORDER_DONE_STATUSES = ("filled", "canceled", "expired")
+ORDER_STATUS_KEEP = 256  # final statuses kept for late waiters; older ones are dropped
+
+class OrderFeed:
+    """
+    Background thread holding Kraken's authenticated v2 `executions` stream, so callers can
+    block until an order fills, is canceled or expires instead of sleeping and polling REST.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events: Dict[str, threading.Event] = {}  # only txids someone is waiting on
+        self._status: "OrderedDict[str, str]" = OrderedDict()
+        self.connected = threading.Event()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._stream()), name="kraken-executions", daemon=True)
+
+    def start(self) -> "OrderFeed":
+        self._thread.start()
+        return self
+
+    def _mark(self, txid: str, status: str):
+        # Recorded even if nobody is waiting yet: the update can beat AddOrder's own response.
+        # Bounded, since every order on the account lands here, including ones nobody waits on
+        with self._lock:
+            self._status[txid] = status
+            while len(self._status) > ORDER_STATUS_KEEP:
+                self._status.popitem(last=False)
+            event = self._events.get(txid)
+        if event is not None:
+            event.set()
+
+    def wait_done(self, txid: str, timeout: float) -> Optional[str]:
+        """Final status of txid ("filled", "canceled", "expired"), or None if still open after timeout."""
+        with self._lock:
+            event = self._events.setdefault(txid, threading.Event())
+            if txid in self._status:
+                event.set()
+        event.wait(timeout)
+        with self._lock:
+            self._events.pop(txid, None)
+            return self._status.pop(txid, None)
+
+    async def _stream(self):
+        backoff = 1
+        while True:
+            try:
+                resp = _http_post(WS_TOKEN_PATH, {})
+                if resp.get("error"):
+                    raise ValueError(f"GetWebSocketsToken error: {resp['error']}")
+                subscription = {
+                    "method": "subscribe",
+                    "params": {"channel": "executions", "token": resp["result"]["token"],
+                               "snap_orders": False, "snap_trades": False},
+                }
+                async with websockets.connect(KRAKEN_WS_AUTH_URI) as ws:
+                    await ws.send(_dumps(subscription))
+                    async for message in ws:
+                        data = _loads(message)
+                        if data.get("method") == "subscribe":
+                            if not data.get("success"):
+                                raise ValueError(f"executions subscribe error: {data.get('error')}")
+                            self.connected.set()
+                            backoff = 1
+                            continue
+                        if data.get("channel") != "executions":
+                            continue
+                        for ex in data.get("data", []):
+                            status = ex.get("order_status")
+                            if status in _ORDER_DONE_STATUSES:
+                                self._mark(ex["order_id"], status)
+            except (websockets.WebSocketException, OSError, ValueError, KeyError, requests.RequestException) as e:
+                logger.warning("Executions feed error: %s. Reconnecting in %ss...", e, backoff)
+            self.connected.clear()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, WS_BACKOFF_MAX_S)
+
+# =============== Top-of-book feed ===============
+
+class BookFeed:
+    """
+    Background thread holding Kraken's public v2 `book` stream for one symbol, so the best
+    bid/ask is a locked read instead of a Ticker round trip.
+    """
+    def __init__(self, wsname: str, depth: int = BOOK_DEPTH):
+        self.wsname = wsname
+        self.depth = depth
+        self._lock = threading.Lock()
+        self._bids: Dict[float, float] = {}
+        self._asks: Dict[float, float] = {}
+        self._top_bid: Optional[float] = None
+        self._top_ask: Optional[float] = None
+        self._last_msg = 0.0  # monotonic time of the last frame, heartbeats included
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._stream()), name="kraken-book", daemon=True)
+
+    def start(self) -> "BookFeed":
+        self._thread.start()
+        return self
+
+    def top(self) -> Optional[Dict[str, Decimal]]:
+        """{'bid', 'ask'} from the feed, or None if it is empty or silent for over BOOK_STALE_S."""
+        with self._lock:
+            if self._top_bid is None or self._top_ask is None or time.monotonic() - self._last_msg > BOOK_STALE_S:
+                return None
+            bid, ask = self._top_bid, self._top_ask
+        return {"bid": Decimal(str(bid)), "ask": Decimal(str(ask))}
+
+    def _apply(self, side: Dict[float, float], levels: List[Dict[str, float]], best) -> Optional[float]:
+        for level in levels:
+            if level["qty"] == 0:
+                side.pop(level["price"], None)
+            else:
+                side[level["price"]] = level["qty"]
+        if len(side) > self.depth:
+            # Kraken leaves truncating to the subscribed depth to the client
+            for price in sorted(side, reverse=best is max)[self.depth:]:
+                del side[price]
+        return best(side) if side else None
+
+    def _on_book(self, msg_type: str, entry: Dict[str, Any]):
+        with self._lock:
+            if msg_type == "snapshot":
+                self._bids.clear()
+                self._asks.clear()
+            self._top_bid = self._apply(self._bids, entry.get("bids", ()), max)
+            self._top_ask = self._apply(self._asks, entry.get("asks", ()), min)
+
+    async def _stream(self):
+        backoff = 1
+        subscription = {
+            "method": "subscribe",
+            "params": {"channel": "book", "symbol": [self.wsname], "depth": self.depth},
+        }
+        while True:
+            try:
+                async with websockets.connect(KRAKEN_WS_URI) as ws:
+                    await ws.send(_dumps(subscription))
+                    async for message in ws:
+                        data = _loads(message)
+                        self._last_msg = time.monotonic()
+                        if data.get("method") == "subscribe":
+                            if not data.get("success"):
+                                raise ValueError(f"book subscribe error: {data.get('error')}")
+                            backoff = 1
+                            continue
+                        if data.get("channel") != "book":
+                            continue
+                        for entry in data.get("data", []):
+                            self._on_book(data.get("type"), entry)
+            except (websockets.WebSocketException, OSError, ValueError, KeyError) as e:
+                logger.warning("Book feed error: %s. Reconnecting in %ss...", e, backoff)
+            with self._lock:
+                self._top_bid = self._top_ask = None
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, WS_BACKOFF_MAX_S)
 
 # =============== Kraken client ===============
 
@@ -93,12 +305,61 @@ class PairRules:
     tick_size: Decimal      # min price increment
     quote: str              # quote currency, e.g., "USD"
     base: str               # base currency, e.g., "ARB"
+    wsname: str             # v2 WebSocket symbol, e.g., "ARB/USD"
+
+_FIAT_QUOTES = ("USD", "EUR", "GBP", "CAD", "JPY", "CHF", "AUD")
+
+def _pair_filter_aliases(altname: str) -> List[str]:
+    """altname plus Kraken's legacy spellings ("XXBTZUSD"-style) to try as pair= filters."""
+    names = [altname]
+    quote = altname[-3:].upper()
+    if quote in _FIAT_QUOTES and len(altname) > 3:
+        base = altname[:-3].upper()
+        for alias in (f"X{base}Z{quote}", f"{base}Z{quote}"):
+            if alias not in names:
+                names.append(alias)
+    return names
+
+@functools.lru_cache(maxsize=32)
+def _pair_rules(altname: str) -> PairRules:
+    """PairRules for a pair via the shared pairs.json cache (AssetPairs on a miss). Memoized for the life of the process."""
+    return cached_pair_rules(altname, PairRules, KrakenClient._fetch_pair_rules)
 
 class KrakenClient:
-    def __init__(self, symbol: str):
+    def __init__(self, symbol: str, order_feed: Optional[OrderFeed] = None):
         # Accept "ARBUSD" or "ARB/USD"; normalize to no-slash for requests
         self.symbol_in = symbol.replace("/", "")
-        self.rules = self._fetch_pair_rules(self.symbol_in)
+        # Only place_maker_then_taker reads these; it starts them on first use
+        self.order_feed = order_feed  # when connected, maker fills are pushed instead of polled
+        self.book_feed: Optional[BookFeed] = None  # when fresh, bid/ask come from it instead of Ticker
+        self.rules = _pair_rules(self.symbol_in)
+        # Hot rule fields bound once
+        self._tick = self.rules.tick_size
+        self._lot_decimals = self.rules.lot_decimals
+        self._ordermin_dec = self.rules.ordermin
+        # Ticks per 1.0 of quote (tick_size is always 10^-pair_decimals)
+        self._price_decimals = -self._tick.as_tuple().exponent
+        self._tick_scale = 10 ** self._price_decimals
+        # Static tail of every post-only AddOrder body, urlencoded once; expiretm's "+" is "%2B"
+        self._order_tail = (
+            f"&ordertype=limit&pair={urllib.parse.quote_plus(self.rules.altname)}"
+            "&oflags=post&timeinforce=GTD&expiretm=%2B"
+        ).encode()
+
+    def price_to_ticks(self, p: Decimal) -> int:
+        """Price as a whole number of ticks (floored; exact for on-grid prices)."""
+        return int(p * self._tick_scale)
+
+    def ticks_to_decimal(self, t: int) -> Decimal:
+        """Whole ticks back to the Decimal price sent to Kraken."""
+        return Decimal(t).scaleb(-self._price_decimals)
+
+    def _post_only_postdata(self, side: str, volume: Decimal, price: Decimal, expire_s: int):
+        """(nonce, body) for a post-only GTD AddOrder; only nonce/type/volume/price/expiry vary."""
+        nonce = _nonce_ms()
+        # Fixed-point formatting: no normalize() pass, and never exponent form ("1E+2", "5E-8")
+        head = f"nonce={nonce}&type={side}&volume={volume:f}&price={price:f}".encode()
+        return nonce, head + self._order_tail + str(expire_s).encode()
 
     def _coerce_volume(self, volume: Decimal, price: Decimal) -> Decimal:
         min_vol = self._min_volume_for_price(price)
@@ -109,12 +370,17 @@ class KrakenClient:
     def get_best_bid_ask(self) -> Dict[str, Decimal]:
         """
         Returns {'bid': Decimal, 'ask': Decimal} for the trading pair.
+        Served from the book feed when it is fresh; otherwise one Ticker call.
         """
+        if self.book_feed is not None:
+            top = self.book_feed.top()
+            if top is not None:
+                return top
         data = _http_get(BASE_URL + TICKER_PATH, {"pair": self.rules.altname})
         if data.get("error"):
             raise ValueError(f"Ticker error: {data['error']}")
         # result is { "<pairkey>": { "a": [ask, wholeLotVol, lotVol], "b": [bid, ...], ... } }
-        key, payload = list(data["result"].items())[0]
+        key, payload = next(iter(data["result"].items()))
         bid = Decimal(str(payload["b"][0]))
         ask = Decimal(str(payload["a"][0]))
         return {"bid": bid, "ask": ask}
@@ -127,24 +393,28 @@ class KrakenClient:
         resp = _http_post(CANCEL_ORDER_PATH, {"txid": txid})
         return resp
 
-    def _fetch_pair_rules(self, altname_guess: str) -> PairRules:
-        # Query asset pairs; find entry that matches our altname
-        data = _http_get(BASE_URL + PAIRS_PATH, {"pair": altname_guess})
-        if data.get("error"):
-            raise ValueError(f"AssetPairs error: {data['error']}")
-        result = data.get("result", {})
+    @staticmethod
+    def _fetch_pair_rules(altname_guess: str) -> PairRules:
+        # Query asset pairs by altname, then by legacy X/Z-prefixed aliases, before the full list
+        result = {}
+        for name in _pair_filter_aliases(altname_guess):
+            data = _http_get(BASE_URL + PAIRS_PATH, {"pair": name})
+            result = data.get("result") or {}
+            if not data.get("error") and result:
+                break
         if not result:
-            # Fallback: try without passing pair filter
+            # Fallback: try without passing pair filter (~400 pairs)
             data = _http_get(BASE_URL + PAIRS_PATH, {})
             result = data.get("result", {})
             # Try to find by altname across all
-            candidates = [ (k, v) for k, v in result.items() if v.get("altname", "").upper() == altname_guess.upper() ]
-            if not candidates:
+            wanted = altname_guess.upper()
+            match = next(((k, v) for k, v in result.items() if v.get("altname", "").upper() == wanted), None)
+            if match is None:
                 raise ValueError(f"Could not resolve Kraken pair for {altname_guess}")
-            key, pairinfo = candidates[0]
+            key, pairinfo = match
         else:
             # When filtered, result may include one item but unknown key; pick first
-            key, pairinfo = list(result.items())[0]
+            key, pairinfo = next(iter(result.items()))
 
         altname = pairinfo.get("altname")
         lot_decimals = int(pairinfo.get("lot_decimals", 8))
@@ -162,8 +432,9 @@ class KrakenClient:
         else:
             # fallback parse altname halves (best-effort)
             base, quote = altname[:3], altname[3:]
+            wsname = f"{base}/{quote}"
 
-        return PairRules(
+        rules = PairRules(
             pair_key=key,
             altname=altname,
             ordermin=ordermin if ordermin > 0 else Decimal("0"),
@@ -171,8 +442,10 @@ class KrakenClient:
             lot_decimals=lot_decimals,
             tick_size=tick_size,
             quote=quote,
-            base=base
+            base=base,
+            wsname=wsname.replace("XBT", "BTC"),  # v2 WS uses BTC, not XBT
         )
+        return rules
 
     def fetch_latest_candles(self, limit: int = 2, interval: int = 1) -> List[Dict[str, Any]]:
         """
@@ -183,40 +456,51 @@ class KrakenClient:
         if data.get("error"):
             raise ValueError(f"OHLC error: {data['error']}")
         # result is { "<pairkey>": [[time, open, high, low, close, vwap, volume, count], ...], "last": n }
-        candles_raw = next(iter(data["result"].values()))
-        out = []
-        for c in candles_raw[-limit:]:
-            out.append({
-                "open": Decimal(str(c[1])),
-                "high": Decimal(str(c[2])),
-                "low":  Decimal(str(c[3])),
-                "close":Decimal(str(c[4])),
-                "volume":Decimal(str(c[6])),
-                "time": int(c[0]),
-            })
-        return out
+        result = data["result"]
+        candles_raw = result.get(self.rules.pair_key)
+        if candles_raw is None:
+            candles_raw = next(v for k, v in result.items() if k != "last")
+        # Column-wise: one comprehension per field, then zip rows back together. REST OHLC values
+        # are already strings, so Decimal takes them as-is (no str() round-trip)
+        rows = candles_raw[-limit:]
+        times = [int(r[0]) for r in rows]
+        opens = [Decimal(r[1]) for r in rows]
+        highs = [Decimal(r[2]) for r in rows]
+        lows = [Decimal(r[3]) for r in rows]
+        closes = [Decimal(r[4]) for r in rows]
+        vols = [Decimal(r[6]) for r in rows]
+        return [
+            {"open": o, "high": h, "low": l, "close": c, "volume": v, "time": t}
+            for o, h, l, c, v, t in zip(opens, highs, lows, closes, vols, times)
+        ]
 
     # ---- sizing helpers ----
     def _round_volume(self, vol: Decimal) -> Decimal:
-        # lot step is 10^(-lot_decimals)
-        step = Decimal("1").scaleb(-self.rules.lot_decimals)
-        # round DOWN to the permitted step
-        return (vol // step) * step
+        # round DOWN to the permitted step (10^(-lot_decimals)): shift, truncate to int, shift back
+        d = self._lot_decimals
+        return Decimal(int(vol.scaleb(d))).scaleb(-d)
 
     def _min_volume_for_price(self, price: Decimal) -> Decimal:
         """
         Compute the minimum volume that satisfies both ordermin (base) and costmin (quote),
         rounded to lot decimals.
         """
-        candidates = [self.rules.ordermin] if self.rules.ordermin and self.rules.ordermin > 0 else []
+        candidates = [self._ordermin_dec] if self._ordermin_dec > 0 else []
         if self.rules.costmin and self.rules.costmin > 0 and price > 0:
             needed = (self.rules.costmin / price)
             candidates.append(needed)
         if not candidates:
-            return self._round_volume(Decimal("0"))
+            return self._round_volume(_ZERO)
         vol = max(candidates)
         return self._round_volume(vol)
 
+    def _ensure_feeds(self):
+        """Start the executions and book feeds the first time the maker/taker path runs."""
+        if self.order_feed is None:
+            self.order_feed = OrderFeed().start()
+        if self.book_feed is None:
+            self.book_feed = BookFeed(self.rules.wsname).start()
+
     def place_maker_then_taker(
         self,
         side: str,
@@ -234,9 +518,12 @@ class KrakenClient:
         - taker_slip_pct: cap for marketable limit (e.g., 0.001 = 0.1%)
         Returns the final order response (maker if filled, otherwise taker).
         """
+        self._ensure_feeds()
         side = side.lower()
+        # Taker cap multiplier, built once: above the ask for buys, below the bid for sells
+        slip_mul = _ONE + taker_slip_pct if side == "buy" else _ONE - taker_slip_pct
         book = self.get_best_bid_ask()
-        tick = self.rules.tick_size
+        tick = self._tick
 
         if side == "buy":
             # Maker: 1 tick UNDER the best bid (so it posts, not takes)
@@ -247,51 +534,55 @@ class KrakenClient:
 
         vol = self._coerce_volume(volume, maker_price)
 
-        maker_fields = {
-            "nonce": _nonce_ms(),
-            "ordertype": "limit",
-            "type": side,
-            "volume": f"{vol.normalize()}",
-            "pair": self.rules.altname,
-            "price": f"{maker_price.normalize()}",
-            "oflags": "post",            # maker only
-            "timeinforce": "GTD",
-            "expiretm": f"+{maker_ttl_s}",
-        }
-        maker_resp = _http_post(ADD_ORDER_PATH, maker_fields)
-        print("maker attempt:", json.dumps(maker_resp, indent=2))
+        maker_resp = _http_post_encoded(ADD_ORDER_PATH, *self._post_only_postdata(side, vol, maker_price, maker_ttl_s))
+        logger.info("maker attempt: %s", maker_resp)
 
         # If maker order error'd, skip straight to taker
         txid = None
         if not maker_resp.get("error") and maker_resp.get("result", {}).get("txid"):
             txid = maker_resp["result"]["txid"][0]
 
-        # Wait briefly for a fill or expiry
-        time.sleep(maker_ttl_s + 0.3)
-
-        # If we had a txid, check status
-        if txid:
-            q = self.query_order(txid)
-            # q["result"][txid]["status"] can be "open", "closed", "canceled", etc.
-            try:
-                status = q["result"][txid]["status"]
-            except Exception:
-                status = None
-            if status in ("closed", "filled"):   # filled
-                print("maker filled:", txid)
+        cancel_future = None
+        if txid and self.order_feed is not None and self.order_feed.connected.is_set():
+            # Returns the moment the executions feed reports a fill, cancel or expiry
+            status = self.order_feed.wait_done(txid, timeout=maker_ttl_s)
+            if status == "filled":
+                logger.info("maker filled: %s", txid)
                 return maker_resp
-            # If still open, cancel to avoid overlap
-            if status == "open":
-                self.cancel_order(txid)
+            if status is None:
+                # Still resting at the TTL: cancel alongside the taker leg rather than before it
+                cancel_future = _EXECUTOR.submit(self.cancel_order, txid)
+        else:
+            # No feed: poll QueryOrders until the maker fills, dies or its TTL runs out
+            if txid:
+                status = None  # last status Kraken actually reported; failed polls don't overwrite it
+                deadline = time.monotonic() + maker_ttl_s
+                while True:
+                    try:
+                        q = self.query_order(txid)
+                    except (requests.RequestException, ValueError):
+                        q = None
+                    if q and not q.get("error"):
+                        # q["result"][txid]["status"] can be "open", "closed", "canceled", etc.
+                        status = q.get("result", {}).get(txid, {}).get("status") or status
+                    if status in ("closed", "filled"):   # filled
+                        logger.info("maker filled: %s", txid)
+                        return maker_resp
+                    if status in ("canceled", "expired") or time.monotonic() >= deadline:
+                        break
+                    time.sleep(MAKER_POLL_S)
+                # Unless it is known to be gone, cancel so the maker can't fill alongside the taker
+                if status not in ("canceled", "expired"):
+                    self.cancel_order(txid)
 
         # ---- Fallback: taker (marketable limit with slippage cap) ----
         book = self.get_best_bid_ask()  # refresh
         if side == "buy":
             # cross the spread at or slightly above best ask, capped by slippage
-            cap = (book["ask"] * (Decimal("1.0") + taker_slip_pct))
+            cap = book["ask"] * slip_mul
             taker_price = cap.quantize(tick, rounding=ROUND_DOWN)
         else:
-            cap = (book["bid"] * (Decimal("1.0") - taker_slip_pct))
+            cap = book["bid"] * slip_mul
             taker_price = cap.quantize(tick, rounding=ROUND_DOWN)
 
         vol2 = self._coerce_volume(volume, taker_price)
@@ -306,7 +597,9 @@ class KrakenClient:
             # no 'post' flag => allowed to take
         }
         taker_resp = _http_post(ADD_ORDER_PATH, taker_fields)
-        print("taker fallback:", json.dumps(taker_resp, indent=2))
+        logger.info("taker fallback: %s", taker_resp)
+        if cancel_future is not None:
+            cancel_future.result()
         return taker_resp
 
     def place_post_only_limit(self, side: str, volume: Decimal, price: Decimal, expire_s: int = 5) -> Dict[str, Any]:
@@ -319,28 +612,25 @@ class KrakenClient:
         if min_vol > 0 and volume < min_vol:
             volume = min_vol
 
-        fields = {
-            "nonce": _nonce_ms(),
-            "ordertype": "limit",
-            "type": side.lower(),
-            "volume": f"{volume.normalize()}",
-            "pair": self.rules.altname,               # Kraken likes altname for trading
-            "price": f"{price.normalize()}",
-            "oflags": "post",                         # post-only
-            "timeinforce": "GTD",
-            "expiretm": f"+{expire_s}",
-        }
-        resp = _http_post(ADD_ORDER_PATH, fields)
+        resp = _http_post_encoded(ADD_ORDER_PATH, *self._post_only_postdata(side.lower(), volume, price, expire_s))
         return resp
 
-    def sleep_until_next_minute(offset_s=0.2):
-        # Wake up just after the boundary: :00 + offset_s
-        now = time.time()
-        next_min = math.floor(now/60)*60 + 60
-        time.sleep(max(0, next_min - now + offset_s))
-
 # =============== Strategy & Context ===============
 
+@njit("Tuple((int64, int64))(int64, int64, int64, int64, int64)", cache=True)
+def _breakout_signal(close_ticks, prev_high_ticks, prev_low_ticks, buffer_bps, in_position):
+    """
+    Breakout decision for one candle, all in whole ticks: (0, 0) to hold,
+    (1, price_ticks) to buy, (-1, price_ticks) to sell.
+
+    Floor-div on whole ticks is the ROUND_DOWN quantize of the buffered price.
+    """
+    if in_position == 0 and close_ticks > prev_high_ticks:
+        return 1, close_ticks * (BPS - buffer_bps) // BPS
+    if in_position != 0 and close_ticks < prev_low_ticks:
+        return -1, close_ticks * (BPS + buffer_bps) // BPS
+    return 0, 0
+
 class CandleBreakoutStrategy:
     """
     Long-only breakout:
@@ -353,39 +643,49 @@ class CandleBreakoutStrategy:
         self.symbol = symbol
         self.qty = qty
         self.buffer = buffer_pct
-        self.position_size = Decimal("0")
-        self.prev_high: Optional[Decimal] = None
-        self.prev_low: Optional[Decimal] = None
+        # Buffer in basis points so buy/sell prices are integer math on ticks
+        self.buffer_bps = int(buffer_pct * BPS)
+        self.position_size = _ZERO
+        # Previous candle levels in integer ticks
+        self.prev_high_ticks: Optional[int] = None
+        self.prev_low_ticks: Optional[int] = None
 
     def on_new_candle(self, current: Dict[str, Decimal]):
+        to_ticks = self.client.price_to_ticks
+        high_ticks = to_ticks(current["high"])
+        low_ticks = to_ticks(current["low"])
         # Initialize prev H/L on first tick
-        if self.prev_high is None or self.prev_low is None:
-            self.prev_high = current["high"]
-            self.prev_low = current["low"]
+        if self.prev_high_ticks is None or self.prev_low_ticks is None:
+            self.prev_high_ticks = high_ticks
+            self.prev_low_ticks = low_ticks
             return
 
-        close = current["close"]
-        long_entry = (close > self.prev_high) and (self.position_size == 0)
-        long_exit  = (close < self.prev_low) and (self.position_size > 0)
+        close_ticks = to_ticks(current["close"])
+        side, price_ticks = _breakout_signal(close_ticks, self.prev_high_ticks, self.prev_low_ticks,
+                                             self.buffer_bps, int(self.position_size > 0))
 
-        # For post-only: BUY below market; SELL above market to avoid immediate match
-        if long_entry:
-            buy_price = (close * (Decimal("1.0") - self.buffer)).quantize(self.client.rules.tick_size, rounding=ROUND_DOWN)
+        # For post-only: BUY below market; SELL above market to avoid immediate match.
+        if side == 1:
+            buy_price = self.client.ticks_to_decimal(price_ticks)
             resp = self.client.place_post_only_limit("buy", self.qty, buy_price, expire_s=5)
-            print("BUY resp:", json.dumps(resp, indent=2))
+            logger.info("BUY resp: %s", resp)
             if not resp.get("error"):
                 self.position_size = self.qty
-
-        if long_exit:
-            sell_price = (close * (Decimal("1.0") + self.buffer)).quantize(self.client.rules.tick_size, rounding=ROUND_DOWN)
+        elif side == -1:
+            sell_price = self.client.ticks_to_decimal(price_ticks)
             resp = self.client.place_post_only_limit("sell", self.position_size, sell_price, expire_s=5)
-            print("SELL resp:", json.dumps(resp, indent=2))
+            logger.info("SELL resp: %s", resp)
             if not resp.get("error"):
-                self.position_size = Decimal("0")
+                self.position_size = _ZERO
 
         # Roll previous candle levels
-        self.prev_high = current["high"]
-        self.prev_low  = current["low"]
+        self.prev_high_ticks = high_ticks
+        self.prev_low_ticks  = low_ticks
+
+def _ws_candle(bar: Dict[str, Any]) -> Dict[str, Decimal]:
+    """A v2 `ohlc` entry as the {high, low, close} dict the strategy takes."""
+    # v2 sends JSON numbers, so go through str() to keep Decimal exact
+    return {"high": Decimal(str(bar["high"])), "low": Decimal(str(bar["low"])), "close": Decimal(str(bar["close"]))}
 
 class TradingContext:
     def __init__(self, client: KrakenClient, strategy: CandleBreakoutStrategy, symbol: str):
@@ -393,32 +693,52 @@ class TradingContext:
         self.strategy = strategy
         self.symbol = symbol
 
-    def run(self, poll_seconds: int = 60):
-        print("Starting loop synced to candle closes…")
+    async def run_ws(self, interval: int = 1):
+        """
+        Streams OHLC over Kraken's v2 WebSocket and runs the strategy once per closed candle.
+
+        A candle counts as closed when the first update for the next interval_begin arrives, so
+        the signal fires on the close itself rather than after a sleep-to-boundary and REST poll.
+        """
+        logger.info("Starting loop on the Kraken OHLC stream (%sm candles)…", interval)
+        subscription = {
+            "method": "subscribe",
+            "params": {"channel": "ohlc", "symbol": [self.client.rules.wsname], "interval": interval, "snapshot": True},
+        }
+        backoff = 1
+        forming: Optional[Dict[str, Any]] = None  # latest raw state of the candle still in progress
         while True:
             try:
-                sleep_until_next_minute(offset_s=0.2)  # ~200 ms after close
-                # Try to fetch the last 2 candles; if the new one isn’t posted yet, retry briefly
-                deadline = time.time() + 1.5  # 1.5s grace for API to publish
-                candles = None
-                while time.time() < deadline:
-                    c = self.client.fetch_latest_candles(limit=2, interval=1)
-                    if len(c) >= 2 and c[-1]["time"] % 60 == 0:
-                        candles = c
-                        break
-                    time.sleep(0.1)
-                if not candles:
-                    # fallback: use whatever we got
-                    candles = self.client.fetch_latest_candles(limit=2, interval=1)
-
-                last = candles[-1]
-                current = {"high": last["high"], "low": last["low"], "close": last["close"]}
-                print(f"[{self.symbol}] close={current['close']} high={current['high']} low={current['low']}")
-                self.strategy.on_new_candle(current)
-
-            except Exception as e:
-                print("Error in loop:", e)
-                time.sleep(2)
+                async with websockets.connect(KRAKEN_WS_URI) as ws:
+                    await ws.send(_dumps(subscription))
+                    async for message in ws:
+                        data = _loads(message)
+                        if data.get("method") == "subscribe":
+                            if not data.get("success"):
+                                raise ValueError(f"OHLC subscribe error: {data.get('error')}")
+                            backoff = 1
+                            continue
+                        if data.get("channel") != "ohlc" or not data.get("data"):
+                            continue
+                        bars = data["data"]
+                        if data.get("type") == "snapshot":
+                            # History only seeds prev H/L; trading starts from the next live close
+                            if self.strategy.prev_high_ticks is None and len(bars) >= 2:
+                                self.strategy.on_new_candle(_ws_candle(bars[-2]))
+                            forming = bars[-1]
+                            continue
+                        for bar in bars:
+                            if forming is not None and bar["interval_begin"] > forming["interval_begin"]:
+                                current = _ws_candle(forming)
+                                logger.info("[%s] close=%s high=%s low=%s", self.symbol, current["close"], current["high"], current["low"])
+                                # Orders are blocking REST calls; keep the socket read side moving meanwhile
+                                await asyncio.to_thread(self.strategy.on_new_candle, current)
+                            if forming is None or bar["interval_begin"] >= forming["interval_begin"]:
+                                forming = bar
+            except (websockets.WebSocketException, OSError, ValueError) as e:
+                logger.warning("WebSocket error: %s. Reconnecting in %ss...", e, backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, WS_BACKOFF_MAX_S)
 
 # =============== Main ===============
 
@@ -426,10 +746,15 @@ if __name__ == "__main__":
     if not API_KEY or not SECRET_KEY:
         raise SystemExit("Set KRAKEN_API_KEY and KRAKEN_API_SECRET in your environment/.env")
 
+    log_listener = start_queue_logging()
+
     SYMBOL = "AVAXUSD"
 
     client = KrakenClient(SYMBOL)
     # Choose a small nominal qty; it will be auto-bumped to ordermin/costmin if too small
     strategy = CandleBreakoutStrategy(client, SYMBOL, qty=Decimal("1.1"), buffer_pct=Decimal("0.02"))
     ctx = TradingContext(client, strategy, SYMBOL)
-    ctx.run(poll_seconds=60)
+    try:
+        asyncio.run(ctx.run_ws(interval=1))
+    finally:
+        log_listener.stop()  # flush queued records before exit
@@ -1,27 +1,57 @@
 """
 Kraken Candle-Breakout Bot (1m)
-- Fetches 1m OHLC from Kraken public API
-- Places post-only GTD 5s limit orders on breakout
+- Streams 1m OHLC from Kraken's v2 WebSocket (REST polling kept as a fallback)
+- Places post-only GTD 5s limit orders on breakout over the authenticated v2 WebSocket (REST fallback)
 - Auto-adjusts volume to satisfy ordermin, costmin, and lot_decimals
 """
 
 import os
 import time
-import json
 import hmac
 import base64
 import hashlib
+import functools
+import logging
+import random
+import threading
 import urllib.parse
-import urllib.request
-from decimal import Decimal, ROUND_DOWN, getcontext
-from dataclasses import dataclass
+import uuid
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import asyncio
+import websockets
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, Context, localcontext
+from dataclasses import dataclass, field
 from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
-
-# Higher precision math for crypto sizing
-getcontext().prec = 28
+from kraken_pairs_cache import cached_pair_rules
+
+# orjson when available (parses bytes directly); stdlib json otherwise
+try:
+    import orjson
+    _loads = orjson.loads
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    import json
+    _loads = json.loads
+    _dumps = json.dumps
+
+# Sizing math runs in a narrower context than the default 28 digits; 18 still covers
+# volume // lot_step exactly for up to 10^10 base units at 8 lot decimals
+_SIZING_CTX = Context(prec=18)
 
 load_dotenv()
+
+# Order responses go out at DEBUG; set LOG_LEVEL=DEBUG to see them
+logger = logging.getLogger("kraken_breakout")
+
 API_KEY = os.getenv("KRAKEN_API_KEY")
 SECRET_KEY = os.getenv("KRAKEN_API_SECRET")  # base64 string from Kraken
 
@@ -29,20 +59,57 @@ BASE_URL = "https://api.kraken.com"
 OHLC_PATH = "/0/public/OHLC"
 PAIRS_PATH = "/0/public/AssetPairs"
 ADD_ORDER_PATH = "/0/private/AddOrder"
+WS_TOKEN_PATH = "/0/private/GetWebSocketsToken"
+OPEN_ORDERS_PATH = "/0/private/OpenOrders"
+CLOSED_ORDERS_PATH = "/0/private/ClosedOrders"
+KRAKEN_WS_URI = "wss://ws.kraken.com/v2"
+KRAKEN_WS_AUTH_URI = "wss://ws-auth.kraken.com/v2"
+ORDER_ACK_TIMEOUT_S = 5
+_SOCKET_CLOSED_BEFORE_ACK = "trade socket closed before ack"
+WS_BACKOFF_MAX_S = 30
+REST_BACKOFF_MIN_S = 0.25
+REST_BACKOFF_MAX_S = 5.0
+# Only network failures are retried; Kraken API errors and parse bugs (ValueError etc.) propagate
+_TRANSIENT_ERRORS = (requests.RequestException, OSError)
+# Order placement failures a loop logs and survives; the next candle tries again
+_ORDER_ERRORS = (requests.RequestException, OSError, websockets.WebSocketException)
+BPS = 10_000  # basis points per 1.0
 
 # =============== HTTP helpers ===============
 
-def _nonce_ms() -> str:
-    return str(int(time.time() * 1000))
+# Kraken wants nonces increasing per API key, not per process: track the wall clock in ms
+# (so restarts and other bots on the key stay in step), bumping by 1 only within the same ms
+_NONCE_LOCK = threading.Lock()
+_last_nonce = 0
 
-def _kraken_sign(secret_b64: str, path: str, nonce: str, postdata_str: str) -> str:
-    if not secret_b64:
+def _nonce_ms() -> str:
+    global _last_nonce
+    with _NONCE_LOCK:
+        _last_nonce = max(_last_nonce + 1, time.time_ns() // 1_000_000)
+        return str(_last_nonce)
+
+# Decoded once; signing runs on every private call
+_SECRET_BYTES = base64.b64decode(SECRET_KEY) if SECRET_KEY else None
+_PATH_BYTES = {path: path.encode() for path in (ADD_ORDER_PATH, WS_TOKEN_PATH, OPEN_ORDERS_PATH, CLOSED_ORDERS_PATH)}
+# Keyed once; copy() reuses the prepared inner/outer pads instead of re-keying per request
+_HMAC_PROTO = hmac.new(_SECRET_BYTES, None, hashlib.sha512) if _SECRET_BYTES else None
+
+def _kraken_sign(path: str, nonce: str, postdata_str: str) -> str:
+    if _HMAC_PROTO is None:
         raise ValueError("KRAKEN_API_SECRET missing.")
-    sha = hashlib.sha256((nonce + postdata_str).encode()).digest()
-    msg = path.encode() + sha
-    secret = base64.b64decode(secret_b64)
-    sig = hmac.new(secret, msg, hashlib.sha512).digest()
-    return base64.b64encode(sig).decode()
+    h = _HMAC_PROTO.copy()
+    h.update(_PATH_BYTES.get(path) or path.encode())
+    h.update(hashlib.sha256((nonce + postdata_str).encode()).digest())
+    return base64.b64encode(h.digest()).decode()
+
+# One pooled keep-alive session for every REST call; Retry skips POST, so AddOrder is never resent
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": "kraken-breakout-bot/1.0"})
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504]),
+))
 
 def _http_post(path: str, fields: Dict[str, str]) -> Dict[str, Any]:
     if not API_KEY or not SECRET_KEY:
@@ -55,26 +122,35 @@ def _http_post(path: str, fields: Dict[str, str]) -> Dict[str, Any]:
     postdata = urllib.parse.urlencode(fields)
     headers = {
         "API-Key": API_KEY,
-        "API-Sign": _kraken_sign(SECRET_KEY, path, fields["nonce"], postdata),
+        "API-Sign": _kraken_sign(path, fields["nonce"], postdata),
         "Content-Type": "application/x-www-form-urlencoded",
-        "User-Agent": "kraken-breakout-bot/1.0",
     }
-    req = urllib.request.Request(
-        url=BASE_URL + path,
-        data=postdata.encode(),
-        headers=headers,
-        method="POST",
-    )
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        data = json.loads(resp.read().decode())
-    return data
+    # Send the exact string that was signed
+    resp = _SESSION.post(BASE_URL + path, data=postdata, headers=headers, timeout=15)
+    resp.raise_for_status()
+    return _loads(resp.content)
 
 def _http_get(url: str, params: Dict[str, str]) -> Dict[str, Any]:
-    qs = urllib.parse.urlencode(params)
-    full = f"{url}?{qs}" if qs else url
-    req = urllib.request.Request(full, method="GET", headers={"User-Agent": "kraken-breakout-bot/1.0"})
-    with urllib.request.urlopen(req, timeout=15) as resp:
-        return json.loads(resp.read().decode())
+    resp = _SESSION.get(url, params=params, timeout=15)
+    resp.raise_for_status()
+    return _loads(resp.content)
+
+def _scaled(value: Any, scale: int) -> int:
+    """Price as an integer count of ticks (value * scale, rounded)."""
+    return int(round(float(value) * scale))
+
+def _ws_candle(bar: Dict[str, Any], price_scale: int) -> Dict[str, Any]:
+    """Converts a v2 `ohlc` entry to the same candle dict fetch_latest_candles returns."""
+    # v2 sends JSON numbers, so go through str() to keep Decimal exact
+    return {
+        "high": Decimal(str(bar["high"])),
+        "low":  Decimal(str(bar["low"])),
+        "close":Decimal(str(bar["close"])),
+        "time": int(datetime.fromisoformat(bar["interval_begin"]).timestamp()),
+        "high_i": _scaled(bar["high"], price_scale),
+        "low_i": _scaled(bar["low"], price_scale),
+        "close_i": _scaled(bar["close"], price_scale),
+    }
 
 # =============== Kraken client ===============
 
@@ -88,14 +164,56 @@ class PairRules:
     tick_size: Decimal      # min price increment
     quote: str              # quote currency, e.g., "USD"
     base: str               # base currency, e.g., "ARB"
+    wsname: str             # WebSocket v2 symbol, e.g., "ARB/USD"
+    # Derived once here so the sizing helpers don't rebuild them per order
+    lot_step: Decimal = field(init=False)   # 10^(-lot_decimals)
+    min_base: Decimal = field(init=False)   # ordermin, or 0 if none
+    min_cost: Decimal = field(init=False)   # costmin, or 0 if none
+    price_decimals: int = field(init=False) # pair_decimals, recovered from tick_size
+    price_scale: int = field(init=False)    # 10^price_decimals: price <-> integer ticks
+
+    def __post_init__(self):
+        self.price_decimals = -self.tick_size.as_tuple().exponent
+        self.price_scale = 10 ** self.price_decimals
+        self.lot_step = Decimal("1").scaleb(-self.lot_decimals)
+        self.min_base = self.ordermin if self.ordermin and self.ordermin > 0 else Decimal("0")
+        self.min_cost = self.costmin if self.costmin and self.costmin > 0 else Decimal("0")
+
+@functools.lru_cache(maxsize=32)
+def _pair_rules(altname: str) -> PairRules:
+    """PairRules for a pair via the shared pairs.json cache (AssetPairs on a miss). Memoized for the life of the process."""
+    return cached_pair_rules(altname, PairRules, KrakenClient._fetch_pair_rules)
 
 class KrakenClient:
     def __init__(self, symbol: str):
         # Accept "ARBUSD" or "ARB/USD"; normalize to no-slash for requests
         self.symbol_in = symbol.replace("/", "")
-        self.rules = self._fetch_pair_rules(self.symbol_in)
-
-    def _fetch_pair_rules(self, altname_guess: str) -> PairRules:
+        self.rules = _pair_rules(self.symbol_in)
+        # Order fields that never change for this pair; each order copies one and fills in the rest
+        self._add_order_template = {
+            "ordertype": "limit",
+            "pair": self.rules.altname,               # Kraken likes altname for trading
+            "oflags": "post",                         # post-only
+            "timeinforce": "GTD",
+        }
+        self._ws_order_template = {
+            "order_type": "limit",
+            "symbol": self.rules.wsname,
+            "post_only": True,
+            "time_in_force": "gtd",
+        }
+        # OHLC "last" cursor per interval; later polls only pull candles since it
+        self._last_ohlc_time: Dict[int, int] = {}
+        # Authenticated trade socket, opened on the first order; acks are matched back by req_id
+        self._ws = None
+        self._ws_token: Optional[str] = None
+        self._ws_reader: Optional[asyncio.Task] = None
+        self._pending_acks: Dict[int, asyncio.Future] = {}
+        self._ws_lock = asyncio.Lock()  # one connect at a time between keep_trade_ws and orders
+        self._req_id = 0
+
+    @staticmethod
+    def _fetch_pair_rules(altname_guess: str) -> PairRules:
         # Query asset pairs; find entry that matches our altname
         data = _http_get(BASE_URL + PAIRS_PATH, {"pair": altname_guess})
         if data.get("error"):
@@ -124,7 +242,7 @@ class KrakenClient:
         costmin = pairinfo.get("costmin")
         costmin = Decimal(str(costmin)) if costmin is not None else None
 
-        wsname = pairinfo.get("wsname", "")  # e.g., "ARB/USD"
+        wsname = pairinfo.get("wsname", "").replace("XBT", "BTC")  # e.g., "ARB/USD"; v2 WS spells XBT as BTC
         if "/" in wsname:
             base, quote = wsname.split("/")
         else:
@@ -139,73 +257,189 @@ class KrakenClient:
             lot_decimals=lot_decimals,
             tick_size=tick_size,
             quote=quote,
-            base=base
+            base=base,
+            wsname=wsname
         )
 
     def fetch_latest_candles(self, limit: int = 2, interval: int = 1) -> List[Dict[str, Any]]:
         """
-        Returns the latest candles as a list of dicts: [{open, high, low, close, volume, time}, ...]
+        Returns the latest candles as a list of dicts: [{high, low, close, time, high_i, low_i, close_i}, ...]
+        (open and volume are not used by the strategy, so they are not parsed)
         interval: minutes (1, 5, 15, 60, etc. per Kraken)
         """
-        data = _http_get(BASE_URL + OHLC_PATH, {"pair": self.rules.altname, "interval": str(interval)})
+        params = {"pair": self.rules.altname, "interval": str(interval)}
+        since = self._last_ohlc_time.get(interval)
+        if since:
+            params["since"] = str(since)
+        data = _http_get(BASE_URL + OHLC_PATH, params)
         if data.get("error"):
             raise ValueError(f"OHLC error: {data['error']}")
         # result is { "<pairkey>": [[time, open, high, low, close, vwap, volume, count], ...], "last": n }
-        candles_raw = next(iter(data["result"].values()))
+        result = data["result"]
+        self._last_ohlc_time[interval] = int(result["last"])
+        # Rows are keyed by the canonical pair key cached in PairRules; scan only if Kraken sent an alias
+        candles_raw = result.get(self.rules.pair_key)
+        if candles_raw is None:
+            candles_raw = next((v for k, v in result.items() if k != "last"), [])
+        scale = self.rules.price_scale
         out = []
         for c in candles_raw[-limit:]:
+            # REST OHLC values are already strings, so Decimal takes them as-is
             out.append({
-                "open": Decimal(str(c[1])),
-                "high": Decimal(str(c[2])),
-                "low":  Decimal(str(c[3])),
-                "close":Decimal(str(c[4])),
-                "volume":Decimal(str(c[6])),
+                "high": Decimal(c[2]),
+                "low":  Decimal(c[3]),
+                "close":Decimal(c[4]),
                 "time": int(c[0]),
+                # Integer ticks for the strategy's comparisons and buffer math
+                "high_i": _scaled(c[2], scale),
+                "low_i": _scaled(c[3], scale),
+                "close_i": _scaled(c[4], scale),
             })
         return out
 
     # ---- sizing helpers ----
     def _round_volume(self, vol: Decimal) -> Decimal:
-        # lot step is 10^(-lot_decimals)
-        step = Decimal("1").scaleb(-self.rules.lot_decimals)
-        # round DOWN to the permitted step
-        return (vol // step) * step
+        # round DOWN to the permitted lot step
+        step = self.rules.lot_step
+        with localcontext(_SIZING_CTX):
+            return (vol // step) * step
 
     def _min_volume_for_price(self, price: Decimal) -> Decimal:
         """
         Compute the minimum volume that satisfies both ordermin (base) and costmin (quote),
         rounded to lot decimals.
         """
-        candidates = [self.rules.ordermin] if self.rules.ordermin and self.rules.ordermin > 0 else []
-        if self.rules.costmin and self.rules.costmin > 0 and price > 0:
-            needed = (self.rules.costmin / price)
-            candidates.append(needed)
-        if not candidates:
-            return self._round_volume(Decimal("0"))
-        vol = max(candidates)
+        rules = self.rules
+        vol = rules.min_base
+        if rules.min_cost and price > 0:
+            with localcontext(_SIZING_CTX):
+                vol = max(vol, rules.min_cost / price)
         return self._round_volume(vol)
 
-    def place_post_only_limit(self, side: str, volume: Decimal, price: Decimal, expire_s: int = 5) -> Dict[str, Any]:
+    # ---- trade socket ----
+    async def _trade_ws(self):
+        """Returns the open trade socket, connecting with a fresh WebSockets token if needed."""
+        async with self._ws_lock:
+            if self._ws_reader is not None and not self._ws_reader.done():
+                return self._ws
+            resp = await asyncio.to_thread(_http_post, WS_TOKEN_PATH, {})
+            if resp.get("error"):
+                raise ValueError(f"GetWebSocketsToken error: {resp['error']}")
+            self._ws_token = resp["result"]["token"]
+            self._ws = await websockets.connect(KRAKEN_WS_AUTH_URI)
+            self._ws_reader = asyncio.create_task(self._read_acks(self._ws))
+            return self._ws
+
+    async def keep_trade_ws(self):
+        """Opens the trade socket ahead of the first order and reopens it whenever it drops."""
+        backoff = 1
+        while True:
+            try:
+                await self._trade_ws()
+                backoff = 1
+                await self._ws_reader
+                print("Trade socket closed; reopening.")
+            except (OSError, ValueError, websockets.WebSocketException) as e:
+                print(f"Trade socket error: {e}. Retrying in {backoff}s...")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, WS_BACKOFF_MAX_S)
+
+    async def _read_acks(self, ws):
+        try:
+            async for message in ws:
+                data = _loads(message)
+                fut = self._pending_acks.pop(data.get("req_id"), None)
+                if fut is not None and not fut.done():
+                    fut.set_result(data)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            # Anything still waiting never got an ack on this socket
+            for fut in self._pending_acks.values():
+                if not fut.done():
+                    fut.set_result({"error": _SOCKET_CLOSED_BEFORE_ACK})
+            self._pending_acks.clear()
+
+    async def place_post_only_limit(self, side: str, volume: Decimal, price: Decimal, expire_s: int = 5) -> Dict[str, Any]:
         """
         Place post-only GTD limit order. Automatically coerces volume up to min if needed.
         side: 'buy' or 'sell'
+        Sent as add_order on the trade socket; falls back to REST AddOrder if the socket can't be opened.
+        Either way the response carries a truthy "error" on failure.
         """
         # Coerce volume up to min requirements
         min_vol = self._min_volume_for_price(price)
         if min_vol > 0 and volume < min_vol:
             volume = min_vol
 
-        fields = {
-            "nonce": _nonce_ms(),
-            "ordertype": "limit",
-            "type": side.lower(),
-            "volume": f"{volume.normalize()}",
-            "pair": self.rules.altname,               # Kraken likes altname for trading
-            "price": f"{price.normalize()}",
-            "oflags": "post",                         # post-only
-            "timeinforce": "GTD",
-            "expiretm": f"+{expire_s}",
-        }
+        try:
+            ws = await self._trade_ws()
+        except (OSError, ValueError, websockets.WebSocketException) as e:
+            print(f"Trade socket unavailable ({e}); sending order over REST")
+            return await asyncio.to_thread(self._place_post_only_limit_rest, side, volume, price, expire_s)
+
+        self._req_id += 1
+        req_id = self._req_id
+        ack = asyncio.get_running_loop().create_future()
+        self._pending_acks[req_id] = ack
+        params = self._ws_order_template.copy()
+        params["side"] = side.lower()
+        params["order_qty"] = float(volume)
+        params["limit_price"] = float(price)
+        params["expire_time"] = (datetime.now(timezone.utc) + timedelta(seconds=expire_s)).isoformat()
+        params["token"] = self._ws_token
+        # Our own id, so an order whose ack never arrives can still be looked up
+        params["cl_ord_id"] = cl_ord_id = str(uuid.uuid4())
+        msg = {"method": "add_order", "params": params, "req_id": req_id}
+        try:
+            await ws.send(_dumps(msg))
+        except websockets.ConnectionClosed:
+            # Not sent, so REST can't double-place it
+            self._pending_acks.pop(req_id, None)
+            return await asyncio.to_thread(self._place_post_only_limit_rest, side, volume, price, expire_s)
+        try:
+            resp = await asyncio.wait_for(ack, timeout=ORDER_ACK_TIMEOUT_S)
+            if resp.get("error") != _SOCKET_CLOSED_BEFORE_ACK:
+                return resp
+            reason = _SOCKET_CLOSED_BEFORE_ACK
+        except asyncio.TimeoutError:
+            self._pending_acks.pop(req_id, None)
+            reason = f"no add_order ack within {ORDER_ACK_TIMEOUT_S}s"
+        # No ack doesn't mean no order: ask Kraken before reporting a failure the caller would retry
+        try:
+            txid = await asyncio.to_thread(self._find_live_order, cl_ord_id)
+        except (requests.RequestException, OSError, ValueError) as e:
+            return {"error": f"{reason}, and lookup failed: {e}"}
+        if txid is None:
+            return {"error": reason}
+        logger.warning("add_order ack missing; %s found on Kraken as %s", cl_ord_id, txid)
+        return {"method": "add_order", "success": True, "result": {"order_id": txid, "cl_ord_id": cl_ord_id}}
+
+    @staticmethod
+    def _find_live_order(cl_ord_id: str) -> Optional[str]:
+        """txid of the order tagged cl_ord_id if it is open or filled; None if Kraken never placed it."""
+        resp = _http_post(OPEN_ORDERS_PATH, {"cl_ord_id": cl_ord_id})
+        if resp.get("error"):
+            raise ValueError(f"OpenOrders error: {resp['error']}")
+        for txid in resp["result"].get("open", {}):
+            return txid
+        resp = _http_post(CLOSED_ORDERS_PATH, {"cl_ord_id": cl_ord_id})
+        if resp.get("error"):
+            raise ValueError(f"ClosedOrders error: {resp['error']}")
+        # An expired or canceled post-only never traded, so only a fill counts as placed
+        for txid, order in resp["result"].get("closed", {}).items():
+            if order.get("status") == "closed":
+                return txid
+        return None
+
+    def _place_post_only_limit_rest(self, side: str, volume: Decimal, price: Decimal, expire_s: int) -> Dict[str, Any]:
+        fields = self._add_order_template.copy()
+        fields["nonce"] = _nonce_ms()
+        fields["type"] = side.lower()
+        # Fixed-point formatting: no normalize() pass, and never exponent form ("1E+2", "5E-8")
+        fields["volume"] = f"{volume:f}"
+        fields["price"] = f"{price:f}"
+        fields["expiretm"] = f"+{expire_s}"
         resp = _http_post(ADD_ORDER_PATH, fields)
         return resp
 
@@ -223,66 +457,164 @@ class CandleBreakoutStrategy:
         self.symbol = symbol
         self.qty = qty
         self.buffer = buffer_pct
+        # Buffer in basis points so buy/sell prices are integer math on ticks
+        self.buffer_bps = int(buffer_pct * BPS)
+        # Per-side price multipliers (in BPS); prices are already whole ticks, so one floor-div is the quantize
+        self._price_mul = {"buy": BPS - self.buffer_bps, "sell": BPS + self.buffer_bps}
         self.position_size = Decimal("0")
-        self.prev_high: Optional[Decimal] = None
-        self.prev_low: Optional[Decimal] = None
+        # Previous candle levels in integer ticks (price * rules.price_scale)
+        self.prev_high_i: Optional[int] = None
+        self.prev_low_i: Optional[int] = None
 
-    def on_new_candle(self, current: Dict[str, Decimal]):
+    def _limit_price(self, side: str, close_i: int) -> Decimal:
+        """Buffered post-only limit for `side`, floored to the tick, as the Decimal Kraken is sent."""
+        ticks = close_i * self._price_mul[side] // BPS
+        return Decimal(ticks).scaleb(-self.client.rules.price_decimals)
+
+    async def on_new_candle(self, current: Dict[str, Any]):
         # Initialize prev H/L on first tick
-        if self.prev_high is None or self.prev_low is None:
-            self.prev_high = current["high"]
-            self.prev_low = current["low"]
+        if self.prev_high_i is None or self.prev_low_i is None:
+            self.prev_high_i = current["high_i"]
+            self.prev_low_i = current["low_i"]
             return
 
-        close = current["close"]
-        long_entry = (close > self.prev_high) and (self.position_size == 0)
-        long_exit  = (close < self.prev_low) and (self.position_size > 0)
+        close_i = current["close_i"]
 
-        # For post-only: BUY below market; SELL above market to avoid immediate match
-        if long_entry:
-            buy_price = (close * (Decimal("1.0") - self.buffer)).quantize(self.client.rules.tick_size, rounding=ROUND_DOWN)
-            resp = self.client.place_post_only_limit("buy", self.qty, buy_price, expire_s=5)
-            print("BUY resp:", json.dumps(resp, indent=2))
+        # For post-only: BUY below market; SELL above market to avoid immediate match.
+        # One if/elif so a single candle can never fire both legs.
+        if not self.position_size and close_i > self.prev_high_i:
+            buy_price = self._limit_price("buy", close_i)
+            resp = await self.client.place_post_only_limit("buy", self.qty, buy_price, expire_s=5)
+            logger.debug("BUY resp: %s", resp)
             if not resp.get("error"):
                 self.position_size = self.qty
 
-        if long_exit:
-            sell_price = (close * (Decimal("1.0") + self.buffer)).quantize(self.client.rules.tick_size, rounding=ROUND_DOWN)
-            resp = self.client.place_post_only_limit("sell", self.position_size, sell_price, expire_s=5)
-            print("SELL resp:", json.dumps(resp, indent=2))
+        elif self.position_size and close_i < self.prev_low_i:
+            sell_price = self._limit_price("sell", close_i)
+            resp = await self.client.place_post_only_limit("sell", self.position_size, sell_price, expire_s=5)
+            logger.debug("SELL resp: %s", resp)
             if not resp.get("error"):
                 self.position_size = Decimal("0")
 
         # Roll previous candle levels
-        self.prev_high = current["high"]
-        self.prev_low  = current["low"]
+        self.prev_high_i, self.prev_low_i = current["high_i"], current["low_i"]
 
 class TradingContext:
     def __init__(self, client: KrakenClient, strategy: CandleBreakoutStrategy, symbol: str):
         self.client = client
         self.strategy = strategy
         self.symbol = symbol
+        self._last_candle_ts = 0  # open time of the last candle handed to the strategy
+        self._seeded = False  # prev H/L seeded from a snapshot (reconnects don't reseed)
+
+    async def _fetch_candles(self, interval: int) -> List[Dict[str, Any]]:
+        """Retries just the OHLC fetch on transient errors, with jittered backoff capped at REST_BACKOFF_MAX_S."""
+        backoff = REST_BACKOFF_MIN_S
+        while True:
+            try:
+                return await asyncio.to_thread(self.client.fetch_latest_candles, limit=2, interval=interval)
+            except _TRANSIENT_ERRORS as e:
+                logger.warning("OHLC fetch failed (%s); retrying in %.2fs", e, backoff)
+                await asyncio.sleep(backoff + random.random() * 0.1)
+                backoff = min(backoff * 2, REST_BACKOFF_MAX_S)
+
+    async def run(self, poll_seconds: int = 60, interval: int = 1):
+        """REST polling fallback for when the market-data socket isn't usable."""
+        print(f"Starting crypto trading loop ({interval}m candles)...")
+        while True:
+            candles = await self._fetch_candles(interval)
+            if len(candles) >= 2:
+                current = candles[-1]
+                ts = current["time"]
+                # Polling faster than the interval sees the same open candle twice; only act on it once
+                if ts == self._last_candle_ts and ts + interval * 60 > time.time():
+                    await asyncio.sleep(poll_seconds)
+                    continue
+                self._last_candle_ts = ts
+                print(f"[{self.symbol}] close={current['close']} high={current['high']} low={current['low']}")
+                try:
+                    await self.strategy.on_new_candle(current)
+                except _ORDER_ERRORS:
+                    logger.exception("Order placement failed on the %s candle", self.symbol)
+            else:
+                print("Insufficient candles returned.")
+            await asyncio.sleep(poll_seconds)
+
+    async def run_ws(self, interval: int = 1):
+        """
+        Streams OHLC over Kraken's v2 WebSocket and runs the strategy once per closed candle.
 
-    def run(self, poll_seconds: int = 60):
-        print("Starting crypto trading loop (1m candles)...")
+        A candle counts as closed when the first update for the next interval_begin arrives.
+        """
+        print(f"Starting crypto trading loop (WS {interval}m candles)...")
+        subscription = {
+            "method": "subscribe",
+            "params": {"channel": "ohlc", "symbol": [self.client.rules.wsname], "interval": interval, "snapshot": True},
+        }
+        backoff = 1
+        scale = self.client.rules.price_scale
+        forming: Optional[Dict[str, Any]] = None  # latest raw state of the candle still in progress
+        # Closed candles go to a worker task, so the read loop keeps draining the socket while orders are in flight
+        candles: asyncio.Queue = asyncio.Queue()
+        worker = asyncio.create_task(self._strategy_worker(candles))
+        try:
+            while True:
+                try:
+                    async with websockets.connect(KRAKEN_WS_URI) as ws:
+                        await ws.send(_dumps(subscription))
+                        async for message in ws:
+                            data = _loads(message)
+                            if data.get("method") == "subscribe":
+                                if not data.get("success"):
+                                    raise ValueError(f"OHLC subscribe error: {data.get('error')}")
+                                backoff = 1
+                                continue
+                            if data.get("channel") != "ohlc" or not data.get("data"):
+                                continue
+                            bars = data["data"]
+                            if data.get("type") == "snapshot":
+                                # History only seeds prev H/L; trading starts from the next live close
+                                if not self._seeded and len(bars) >= 2:
+                                    candles.put_nowait(_ws_candle(bars[-2], scale))
+                                    self._seeded = True
+                                forming = bars[-1]
+                                continue
+                            for bar in bars:
+                                if forming is not None and bar["interval_begin"] > forming["interval_begin"]:
+                                    closed = _ws_candle(forming, scale)
+                                    print(f"[{self.symbol}] close={closed['close']} high={closed['high']} low={closed['low']}")
+                                    candles.put_nowait(closed)
+                                if forming is None or bar["interval_begin"] >= forming["interval_begin"]:
+                                    forming = bar
+                except (websockets.WebSocketException, OSError, ValueError) as e:
+                    print(f"WebSocket error: {e}. Reconnecting in {backoff}s...")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, WS_BACKOFF_MAX_S)
+        finally:
+            worker.cancel()
+
+    async def _strategy_worker(self, candles: asyncio.Queue):
+        """Feeds closed candles to the strategy one at a time, in arrival order."""
         while True:
+            candle = await candles.get()
             try:
-                candles = self.client.fetch_latest_candles(limit=2, interval=1)
-                if len(candles) >= 2:
-                    last = candles[-1]
-                    current = {
-                        "high": last["high"],
-                        "low": last["low"],
-                        "close": last["close"],
-                    }
-                    print(f"[{self.symbol}] close={current['close']} high={current['high']} low={current['low']}")
-                    self.strategy.on_new_candle(current)
-                else:
-                    print("Insufficient candles returned.")
-                time.sleep(poll_seconds)
-            except Exception as e:
-                print("Error in loop:", e)
-                time.sleep(10)
+                await self.strategy.on_new_candle(candle)
+            except _ORDER_ERRORS:
+                logger.exception("Order placement failed on the %s candle", self.symbol)
+
+    async def _heartbeat(self, every_s: int):
+        while True:
+            await asyncio.sleep(every_s)
+            s = self.strategy
+            print(f"{self.symbol} pos: {s.position_size} | prev H/L ticks: {s.prev_high_i}/{s.prev_low_i}")
+
+    async def run_async(self, interval: int = 1, heartbeat_s: int = 60):
+        """Runs the OHLC stream, the trade socket and a status heartbeat side by side on one event loop."""
+        await asyncio.gather(
+            self.run_ws(interval),
+            self.client.keep_trade_ws(),
+            self._heartbeat(heartbeat_s),
+        )
 
 # =============== Main ===============
 
@@ -290,10 +622,15 @@ if __name__ == "__main__":
     if not API_KEY or not SECRET_KEY:
         raise SystemExit("Set KRAKEN_API_KEY and KRAKEN_API_SECRET in your environment/.env")
 
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
     SYMBOL = "ENAUSD"
 
     client = KrakenClient(SYMBOL)
     # Choose a small nominal qty; it will be auto-bumped to ordermin/costmin if too small
     strategy = CandleBreakoutStrategy(client, SYMBOL, qty=Decimal("20"), buffer_pct=Decimal("0.02"))
     ctx = TradingContext(client, strategy, SYMBOL)
-    ctx.run(poll_seconds=60)
+    # uvloop when installed; the stock event loop otherwise
+    run = uvloop.run if uvloop is not None else asyncio.run
+    run(ctx.run_async(interval=1))
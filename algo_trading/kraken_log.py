@@ -0,0 +1,27 @@
+"""
+Queue-backed logging for the Kraken bots: callers only enqueue records, a listener thread
+formats them and writes to stderr. Level comes from LOG_LEVEL (default INFO).
+"""
+
+import os
+import queue
+import logging
+import logging.handlers
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues the record as-is; the stock prepare() would %-format it on the calling thread."""
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def start_queue_logging() -> logging.handlers.QueueListener:
+    """Installs the queue handler on the root logger and starts the listener; stop() it on exit."""
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    root = logging.getLogger()
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    listener.start()
+    return listener
@@ -0,0 +1,61 @@
+"""
+Disk cache of Kraken pair rules shared by the Kraken bots: one ~/.cache/kraken_breakout/pairs.json
+keyed by upper-case altname, each entry {"fetched": epoch_s, "rules": {init fields}}, reused for a day.
+"""
+
+import os
+import json
+import time
+import dataclasses
+from decimal import Decimal
+from typing import Any, Callable, Dict, Type, TypeVar
+
+PAIRS_CACHE_FILE = os.path.expanduser("~/.cache/kraken_breakout/pairs.json")
+PAIRS_CACHE_TTL_S = 24 * 3600
+DECIMAL_RULE_FIELDS = ("ordermin", "costmin", "tick_size")
+
+R = TypeVar("R")
+
+def _read_pairs_cache() -> Dict[str, Any]:
+    try:
+        with open(PAIRS_CACHE_FILE, "rb") as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        return {}
+
+def _write_pairs_cache(cache: Dict[str, Any]) -> None:
+    try:
+        os.makedirs(os.path.dirname(PAIRS_CACHE_FILE), exist_ok=True)
+        tmp = PAIRS_CACHE_FILE + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp, PAIRS_CACHE_FILE)
+    except OSError:
+        pass  # cache is best-effort; the next start just refetches
+
+def cached_pair_rules(altname: str, rules_cls: Type[R], fetch: Callable[[str], R]) -> R:
+    """
+    rules_cls for a pair from the cache when fetched within PAIRS_CACHE_TTL_S, otherwise
+    fetch(altname), written back. rules_cls is a dataclass; only its init fields are stored.
+    """
+    key = altname.upper()
+    cache = _read_pairs_cache()
+    entry = cache.get(key)
+    if entry and time.time() - entry.get("fetched", 0) < PAIRS_CACHE_TTL_S:
+        try:
+            loaded = dict(entry["rules"])
+            for name in DECIMAL_RULE_FIELDS:
+                if loaded[name] is not None:
+                    loaded[name] = Decimal(loaded[name])
+            return rules_cls(**loaded)
+        except (KeyError, TypeError, ArithmeticError):
+            pass  # entry from an older layout; refetch it
+
+    rules = fetch(altname)
+    stored = {f.name: getattr(rules, f.name) for f in dataclasses.fields(rules_cls) if f.init}
+    for name in DECIMAL_RULE_FIELDS:
+        if stored[name] is not None:
+            stored[name] = str(stored[name])
+    cache[key] = {"fetched": time.time(), "rules": stored}
+    _write_pairs_cache(cache)
+    return rules
@@ -0,0 +1,845 @@
+"""
+Algorithmic Trading System Skeleton
+
+Long-only one-bar breakout, parametrized by symbol, quantity, timeframe and broker.
+Market data comes from Alpaca (broker = "alpaca") or Public (broker = "public"); orders always go through Public.
+Runs during market hours (9:30 AM - 4:00 PM EST) and polls once per bar.
+Network I/O runs on asyncio + httpx (HTTP/2) so independent requests can be awaited concurrently
+and multiplexed over one connection per host.
+"""
+
+import argparse
+import asyncio
+import os
+import logging
+import logging.handlers
+import time
+import uuid
+import collections
+import pickle
+import httpx
+import orjson
+import keyring
+import keyring.errors
+import diskcache
+import datetime
+import math
+import functools
+import tomllib
+import pytz
+import pandas_market_calendars as mcal
+import numpy as np
+import h5py
+from numba import njit, prange
+from dotenv import load_dotenv
+from dataclasses import dataclass
+from typing import Dict, Any, List
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+def _configure_logging(log_file: str):
+    """Logs to a size-capped rotating file plus stderr; LOG_LEVEL=DEBUG turns on response bodies."""
+    fmt = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=5_000_000, backupCount=3)
+    file_handler.setFormatter(fmt)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(fmt)
+    root = logging.getLogger()
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    root.addHandler(file_handler)
+    root.addHandler(stream_handler)
+
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+_KEYRING_SERVICE = "public_api"
+_TOKEN_REUSE_S = 23 * 3600  # tokens are minted for 24h; stop reusing an hour early
+_RETRIES = 3
+_BACKOFF_S = 0.2  # doubled per attempt
+_NO_DATA_BACKOFF_S = 15 * 60  # how long a symbol with no bars is left out of polls
+
+# Bar length per timeframe, in both Alpaca ('1Min') and Public ('1m') spellings
+_TIMEFRAME_S = {'1Min': 60, '2Min': 120, '5Min': 300, '1m': 60, '2m': 120, '5m': 300}
+# Extra bars of lookback on Alpaca bar requests, so a few minutes with no trades still leave `limit` bars
+_BARS_LOOKBACK_SLACK = 10
+_ALPACA_PAGE_LIMIT = 10000  # Alpaca's per-page maximum
+
+# Per-symbol bar history: rows are open/high/low/close, columns are a ring of the last _RING_SIZE bars
+_RING_SIZE = 4096
+_O, _H, _L, _C = range(4)
+
+def _to_epoch_s(timestamp: str) -> int:
+    """Converts an RFC 3339 bar timestamp (e.g. '2024-01-02T14:30:00Z') to epoch seconds."""
+    return int(np.datetime64(timestamp.rstrip('Z'), 's').astype(np.int64))
+
+_EST = pytz.timezone('US/Eastern')
+_OPEN = datetime.time(9, 30)
+_CLOSE = datetime.time(16, 0)
+
+_CALENDAR_CACHE = os.path.expanduser("~/.cache/nyse_calendar.pkl")
+_CALENDAR_MAX_AGE_S = 30 * 86400
+
+@functools.lru_cache(maxsize=1)
+def _open_days() -> frozenset:
+    """NYSE session dates for the coming year; pickled to disk and refetched once the file is 30 days old."""
+    try:
+        if time.time() - os.path.getmtime(_CALENDAR_CACHE) < _CALENDAR_MAX_AGE_S:
+            with open(_CALENDAR_CACHE, 'rb') as f:
+                return pickle.load(f)
+    except (OSError, pickle.UnpicklingError):
+        pass
+    today = datetime.datetime.now(_EST).date()
+    schedule = mcal.get_calendar("NYSE").schedule(start_date=today, end_date=today + datetime.timedelta(days=365))
+    days = frozenset(schedule.index.date)
+    os.makedirs(os.path.dirname(_CALENDAR_CACHE), exist_ok=True)
+    with open(_CALENDAR_CACHE, 'wb') as f:
+        pickle.dump(days, f)
+    return days
+
+@functools.lru_cache(maxsize=400)
+def _is_trading_day(day: datetime.date) -> bool:
+    """Memoized per date; the answer only changes once a day."""
+    days = _open_days()
+    if day > max(days):
+        return day.weekday() < 5  # Past the cached calendar: fall back to Mon-Fri
+    return day in days
+
+def _seconds_until_open(now: datetime.datetime) -> float:
+    """Seconds from `now` (US/Eastern) until the next regular session opens."""
+    day = now.date()
+    if now.time() >= _OPEN:
+        day += datetime.timedelta(days=1)
+    while not _is_trading_day(day):
+        day += datetime.timedelta(days=1)
+    next_open = _EST.localize(datetime.datetime.combine(day, _OPEN))
+    return max(0.0, (next_open - now).total_seconds())
+
+def _seconds_until_next_bar(interval_s: int = 60, offset_s: float = 1.0) -> float:
+    """Seconds until `offset_s` past the next wall-clock multiple of `interval_s` (e.g. HH:MM:01)."""
+    now = time.time()
+    return max(0.0, math.floor(now / interval_s) * interval_s + interval_s + offset_s - now)
+
+def breakout_conditions(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray):
+    """
+    Vectorized breakout check over many symbols at once.
+
+    Args:
+        highs, lows, closes (np.ndarray): (n_symbols, n_bars) arrays in time order.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Boolean (n_symbols, n_bars) arrays marking where close broke
+        above the previous bar's high (entry) or below its low (exit); column 0 is always False.
+        Position state is not applied.
+    """
+    entries = closes > np.roll(highs, 1, axis=1)
+    exits = closes < np.roll(lows, 1, axis=1)
+    entries[:, 0] = False
+    exits[:, 0] = False
+    return entries, exits
+
+@dataclass(slots=True)
+class Candle:
+    """One OHLCV bar; slots give fixed-offset attribute access instead of dict lookups."""
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    timestamp: str
+
+class BarStore:
+    """
+    Append-only OHLCV history for one symbol in bars/<SYMBOL>.h5, shared by live trading and backtests.
+
+    Rows of open/high/low/close/volume live in the `timeframe` dataset, with their
+    epoch-second open times in `<timeframe>_t`.
+    """
+
+    def __init__(self, symbol: str, timeframe: str = '1Min', interval_s: int = 60, root: str = "bars"):
+        os.makedirs(root, exist_ok=True)
+        self._h5 = h5py.File(os.path.join(root, f"{symbol.upper()}.h5"), "a")
+        if timeframe not in self._h5:
+            self._h5.create_dataset(timeframe, shape=(0, 5), maxshape=(None, 5), chunks=(1024, 5),
+                                    dtype=np.float64, compression="lzf")
+            self._h5.create_dataset(f"{timeframe}_t", shape=(0,), maxshape=(None,), chunks=(1024,),
+                                    dtype=np.int64, compression="lzf")
+        self._rows = self._h5[timeframe]
+        self._t = self._h5[f"{timeframe}_t"]
+        self._interval_s = interval_s
+        self._last_t = int(self._t[-1]) if self._t.shape[0] else -1
+
+    def append(self, bars: List[Candle]):
+        """Appends bars newer than the last stored one, skipping the bar still forming."""
+        cutoff = time.time() - self._interval_s
+        new = []
+        for bar in bars:
+            t = _to_epoch_s(bar.timestamp)
+            if self._last_t < t <= cutoff:
+                new.append((t, bar))
+        if not new:
+            return
+        n, k = self._t.shape[0], len(new)
+        self._rows.resize(n + k, axis=0)
+        self._t.resize(n + k, axis=0)
+        self._rows[n:] = [(b.open, b.high, b.low, b.close, b.volume) for _, b in new]
+        self._t[n:] = [t for t, _ in new]
+        self._last_t = new[-1][0]
+        self._h5.flush()
+
+    def tail(self, n: int):
+        """Returns the last `n` stored bars as ((k, 5) float64 rows, (k,) int64 epoch seconds), k <= n."""
+        return self._rows[-n:], self._t[-n:]
+
+    def close(self):
+        self._h5.close()
+
+@njit(cache=True)
+def breakout_step(prev_high: float, prev_low: float, close: float, position: float) -> int:
+    """Single-bar breakout decision: +1 buy, -1 sell, 0 hold."""
+    if position == 0 and close > prev_high:
+        return 1
+    if position > 0 and close < prev_low:
+        return -1
+    return 0
+
+@njit(parallel=True, cache=True)
+def run_breakout(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, out_signals: np.ndarray):
+    """
+    Replays the long-only breakout state machine over (n_symbols, n_bars) arrays.
+
+    Writes +1/-1/0 per bar into out_signals (same shape, integer dtype); symbols run in parallel.
+    """
+    n_sym, n_bars = closes.shape
+    for i in prange(n_sym):
+        pos = 0
+        out_signals[i, 0] = 0
+        for t in range(1, n_bars):
+            sig = breakout_step(highs[i, t - 1], lows[i, t - 1], closes[i, t], pos)
+            out_signals[i, t] = sig
+            if sig == 1:
+                pos = 1
+            elif sig == -1:
+                pos = 0
+
+class HybridAPIClient:
+    """
+    Hybrid client using Alpaca for market data and Public for trading.
+
+    Use as an async context manager so the pooled httpx client is opened
+    inside the running event loop and closed on exit.
+    """
+
+    def __init__(self, alpaca_api_key: str, alpaca_secret_key: str, public_api_key: str, public_secret_key: str,
+                 bar_cache_dir: str = "./.bar_cache", buffer_pct: float = 0.022, timeframe: str = '1Min',
+                 order_type: str = 'LIMIT'):
+        """
+        Initializes the hybrid API client with credentials.
+
+        Args:
+            alpaca_api_key (str): Alpaca API key.
+            alpaca_secret_key (str): Alpaca secret key.
+            public_api_key (str): Public API key.
+            public_secret_key (str): Public secret key.
+            bar_cache_dir (str): Directory for the on-disk cache of completed bars.
+            buffer_pct (float): Buffer percentage for limit prices (above last for BUY, below for SELL).
+            timeframe (str): Bar timeframe the trading loop polls, in this data source's spelling.
+            order_type (str): 'LIMIT' (buffered, with a MARKET fallback) or 'MARKET'.
+        """
+        self.timeframe = timeframe
+        self.order_type = order_type.upper()
+        if self.order_type not in ('LIMIT', 'MARKET'):
+            raise ValueError(f"Unknown order_type: {order_type}")
+
+        # Limit-price multipliers are fixed for the client's lifetime
+        self._buy_mult = 1.0 + buffer_pct
+        self._sell_mult = 1.0 - buffer_pct
+
+        # Completed bars persist across restarts; get_cached_bar reads them back by timestamp
+        self._bar_cache = diskcache.Cache(bar_cache_dir)
+        # Full per-symbol history in HDF5, the same files backtests replay from
+        self._bar_stores: Dict[tuple, BarStore] = {}
+
+        # Created in __aenter__; HTTP/2 multiplexes concurrent requests over one TLS connection per host
+        self._session: httpx.AsyncClient = None
+        self._timeout = httpx.Timeout(10.0)
+
+        # Alpaca setup (sent per request so the Alpaca keys never reach Public)
+        self.alpaca_headers = {
+            "APCA-API-KEY-ID": alpaca_api_key,
+            "APCA-API-SECRET-KEY": alpaca_secret_key,
+            "accept": "application/json"
+        }
+
+        # Public setup
+        self.public_api_key = public_api_key
+        self.public_secret_key = public_secret_key
+        self._auth_body = orjson.dumps({"validityInMinutes": 1440, "secret": public_secret_key})
+        self.public_access_token = None
+        self.public_account_id = None
+        self._auth_headers: Dict[str, str] = {}
+
+        # Orders are queued by submit() and sent by run_order_worker(); results land in self.orders
+        self._order_q: asyncio.Queue = asyncio.Queue()
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self._id_pool: collections.deque = collections.deque()
+        self._order_templates: Dict[tuple, Dict[str, Any]] = {}
+
+    async def __aenter__(self):
+        # Pool limits and http2 go on the transport; the client ignores its own once one is given
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=8, max_connections=16, keepalive_expiry=75),
+            retries=3  # connect failures only
+        )
+        self._session = httpx.AsyncClient(transport=transport, timeout=self._timeout)
+        # A restart within the token's lifetime reuses it instead of minting a new one
+        if not await self._restore_cached_token():
+            await self._authenticate_public()
+        logger.info("HybridAPIClient initialized with Alpaca data and Public trading credentials.")
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._session.aclose()
+        self._bar_cache.close()
+        for store in self._bar_stores.values():
+            store.close()
+
+    def bar_store(self, symbol: str, timeframe: str = '1Min') -> BarStore:
+        """Returns the on-disk bar history for a symbol, opening it on first use."""
+        key = (symbol.upper(), timeframe)
+        store = self._bar_stores.get(key)
+        if store is None:
+            store = self._bar_stores[key] = BarStore(symbol, timeframe, _TIMEFRAME_S[timeframe])
+        return store
+
+    @staticmethod
+    def _bar_key(symbol: str, timeframe: str, bar_ts: str) -> str:
+        return f"{symbol.upper()}-{timeframe}-{bar_ts}"
+
+    def get_cached_bar(self, symbol: str, timeframe: str, bar_ts: str) -> Candle:
+        """
+        Returns a completed bar by its Alpaca timestamp from the on-disk bar cache.
+
+        Raises:
+            KeyError: If the bar has not been cached.
+        """
+        bar = self._bar_cache.get(self._bar_key(symbol, timeframe, bar_ts))
+        if bar is None:
+            raise KeyError(bar_ts)
+        return bar
+
+    def _cache_bars(self, symbol: str, timeframe: str, bars: List[Candle]):
+        """Writes completed bars to disk, skipping any bar whose interval hasn't ended yet."""
+        # A bar is final once open + its length has passed; for 2Min/5Min that isn't the current minute
+        cutoff = time.time() - _TIMEFRAME_S[timeframe]
+        for bar in bars:
+            if _to_epoch_s(bar.timestamp) > cutoff:
+                continue
+            self._bar_cache.set(self._bar_key(symbol, timeframe, bar.timestamp), bar)
+
+    async def _authenticate_public(self):
+        """Fetches and caches Public access token and account ID."""
+        logger.info("Attempting Public authentication with API Key: %s...", self.public_api_key[:4])
+        try:
+            r = await self._session.post("https://api.public.com/userapiauthservice/personal/access-tokens",
+                                         content=self._auth_body, headers=_JSON_HEADERS)
+        except httpx.TransportError as e:
+            raise ValueError(f"Network error during authentication: {str(e)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Authentication response: %s, %s", r.status_code, r.text)
+        if r.status_code != 200:
+            raise ValueError(f"Failed to get access token: {r.status_code}, {r.text}")
+        self._set_token(orjson.loads(r.content)["accessToken"])
+        await self._fetch_account_id()
+        try:
+            keyring.set_password(_KEYRING_SERVICE, self.public_api_key, orjson.dumps(
+                {"tok": self.public_access_token, "exp": time.time() + _TOKEN_REUSE_S}).decode())
+        except keyring.errors.KeyringError as e:
+            logger.warning("Could not cache Public token in keyring: %s", e)
+
+    async def _restore_cached_token(self) -> bool:
+        """Reuses an unexpired token from the OS keyring; True if Public still accepts it."""
+        try:
+            raw = keyring.get_password(_KEYRING_SERVICE, self.public_api_key)
+        except keyring.errors.KeyringError:
+            return False
+        if not raw:
+            return False
+        try:
+            cached = orjson.loads(raw)
+            token, expired = cached["tok"], cached["exp"] <= time.time()
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            # Corrupt or old-format entry: just authenticate afresh
+            return False
+        if expired:
+            return False
+        self._set_token(token)
+        try:
+            # Doubles as the validity check: a revoked token fails here with 401
+            await self._fetch_account_id()
+        except ValueError:
+            logger.info("Cached Public token rejected; re-authenticating.")
+            return False
+        return True
+
+    def _set_token(self, token: str):
+        self.public_access_token = token
+        # Built once per token; passed per request so the bearer token is never sent to Alpaca
+        self._auth_headers = {'Authorization': f'Bearer {token}',
+                              'Content-Type': 'application/json'}
+
+    async def _fetch_account_id(self):
+        try:
+            r = await self._session.get("https://api.public.com/userapigateway/trading/account",
+                                        headers=self._auth_headers)
+        except httpx.TransportError as e:
+            raise ValueError(f"Network error fetching account: {str(e)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Account fetch response: %s, %s", r.status_code, r.text)
+        if r.status_code != 200:
+            raise ValueError(f"Failed to get account ID: {r.status_code}, {r.text}")
+        self.public_account_id = orjson.loads(r.content)["accounts"][0]['accountId']
+
+    async def _refresh_token_if_needed(self, status: int):
+        """Refreshes Public token on 401 unauthorized."""
+        if status == 401:
+            logger.info("Access token expired. Refreshing...")
+            await self._authenticate_public()
+
+    async def fetch_latest_candles(self, symbols: List[str], timeframe: str = '1Min',
+                                   limit: int = 2) -> Dict[str, List[Candle]]:
+        """
+        Fetches the latest historical bars (candles) for several symbols in one Alpaca request.
+
+        Args:
+            symbols (List[str]): Stock symbols (e.g., ['MSTX']).
+            timeframe (str): Candle timeframe (e.g., '1Min' for 1 minute).
+            limit (int): Number of bars to fetch per symbol.
+
+        Returns:
+            Dict[str, List[Candle]]: Bars in time order, keyed by upper-case symbol.
+                Symbols Alpaca returned no bars for are absent.
+        """
+        symbols = [s.upper() for s in symbols]
+        logger.debug("Fetching latest %s candles for %s from Alpaca...", timeframe, symbols)
+        url = "https://data.alpaca.markets/v2/stocks/bars"
+        # Alpaca's limit caps the combined, symbol-ordered result and pages the rest, so one symbol
+        # could use it all up; instead bound the window by start and page through everything in it
+        lookback = datetime.timedelta(seconds=_TIMEFRAME_S[timeframe] * (limit + _BARS_LOOKBACK_SLACK))
+        start = datetime.datetime.now(datetime.timezone.utc) - lookback
+        params = {
+            "symbols": ",".join(symbols),
+            "timeframe": timeframe,
+            "start": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "limit": _ALPACA_PAGE_LIMIT,
+            "adjustment": "raw"
+        }
+        raw_bars: Dict[str, List[Dict[str, Any]]] = {}
+        while True:
+            # Network errors propagate unwrapped so the loop can tell them apart from bad responses
+            r = await self._session.get(url, headers=self.alpaca_headers, params=params)
+            if r.status_code != 200:
+                raise ValueError(f"Failed to fetch candles: {r.status_code}, {r.text}")
+            data = orjson.loads(r.content)
+            # Alpaca sends null/{} when nothing traded; TradingContext backs off those symbols
+            for symbol, bars in (data.get("bars") or {}).items():
+                raw_bars.setdefault(symbol, []).extend(bars)
+            if not data.get("next_page_token"):
+                break
+            params["page_token"] = data["next_page_token"]
+        short = [s for s in symbols if 0 < len(raw_bars.get(s, ())) < limit]
+        if short:
+            logger.warning("Alpaca returned fewer than %d %s bars for %s", limit, timeframe, short)
+        out: Dict[str, List[Candle]] = {}
+        for symbol, bars in raw_bars.items():
+            formatted_bars = [
+                Candle(bar['o'], bar['h'], bar['l'], bar['c'], bar['v'], bar['t']) for bar in bars[-limit:]
+            ]
+            self._cache_bars(symbol, timeframe, formatted_bars)
+            self.bar_store(symbol, timeframe).append(formatted_bars)
+            out[symbol] = formatted_bars
+        return out
+
+    def _next_order_id(self) -> str:
+        """Returns a UUID4 order ID, drawing 64 IDs' worth of randomness per os.urandom call."""
+        if not self._id_pool:
+            raw = os.urandom(16 * 64)
+            self._id_pool.extend(str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, 16 * 64, 16))
+        return self._id_pool.popleft()
+
+    def order_template(self, symbol: str, side: str) -> Dict[str, Any]:
+        """
+        Returns the static part of an order body for (symbol, side), built once and reused.
+
+        Callers copy it and fill in the per-order fields; the nested dicts are shared and must not be mutated.
+        """
+        key = (symbol.upper(), side.upper())
+        template = self._order_templates.get(key)
+        if template is None:
+            template = self._order_templates[key] = {
+                "instrument": {"symbol": key[0], "type": "EQUITY"},
+                "orderSide": key[1],
+                "orderType": self.order_type,
+                "expiration": {"timeInForce": "DAY"},
+            }
+        return template
+
+    async def place_order(self, symbol: str, side: str, quantity: int, last_price: float = None,
+                          order_id: str = None) -> bool:
+        """
+        Places a trading order using Public API.
+
+        Args:
+            symbol (str): The stock symbol.
+            side (str): 'BUY' or 'SELL'.
+            quantity (int): The number of shares to trade.
+            last_price (float): Reference price for the limit; fetched from Alpaca if omitted.
+                Unused for MARKET orders.
+            order_id (str): Client order ID; one is drawn from the ID pool if omitted.
+
+        Returns:
+            bool: True if successful.
+        """
+        logger.info("Placing %s %s order for %s shares of %s via Public...", self.order_type, side, quantity, symbol)
+        url = f"https://api.public.com/userapigateway/trading/{self.public_account_id}/order"
+        data = self.order_template(symbol, side).copy()
+        data["orderId"] = order_id or self._next_order_id()
+        data["quantity"] = str(quantity)
+        if self.order_type == 'MARKET':
+            r = await self._post_order(url, data)
+            if r.status_code == 200:
+                logger.info("MARKET %s order placed", side)
+                return True
+            logger.warning("Order failed: %s, %s", r.status_code, r.text)
+            return False
+
+        if last_price is None:
+            # Fetch last price from Alpaca (simplified; use for limit price)
+            candles = (await self.fetch_latest_candles([symbol], self.timeframe, 1)).get(symbol.upper())
+            last_price = candles[0].close if candles else None
+        if not last_price:
+            logger.warning("Failed to fetch last price for limit order.")
+            return False
+
+        # Calculate limit price
+        limit_price = last_price * (self._buy_mult if side.upper() == 'BUY' else self._sell_mult)
+
+        data["limitPrice"] = f"{limit_price:.2f}"
+        r = await self._post_order(url, data)
+        if r.status_code == 200:
+            logger.info("LIMIT %s order placed at %.2f", side, limit_price)
+            return True
+        else:
+            logger.warning("Order failed: %s, %s", r.status_code, r.text)
+            # Fallback to MARKET, as a new order: the rejected limit's orderId is spent
+            data["orderType"] = "MARKET"
+            data["orderId"] = self._next_order_id()
+            del data["limitPrice"]
+            r = await self._post_order(url, data)
+            success = r.status_code == 200
+            logger.info("Fallback to MARKET: %s", 'success' if success else 'failed')
+            return success
+
+    async def _post_order(self, url: str, data: Dict[str, Any]) -> httpx.Response:
+        r = await self._session.post(url, content=orjson.dumps(data), headers=self._auth_headers)
+        if r.status_code == 401:
+            # Re-auth and resend the same order inline rather than failing it back to the caller
+            await self._refresh_token_if_needed(r.status_code)
+            r = await self._session.post(url, content=orjson.dumps(data), headers=self._auth_headers)
+        return r
+
+    def submit(self, symbol: str, side: str, quantity: int, last_price: float = None) -> asyncio.Future:
+        """
+        Queues an order without waiting for the broker.
+
+        Returns:
+            asyncio.Future: Resolves to place_order's result once the worker has sent it.
+        """
+        order_id = self._next_order_id()
+        ticket = asyncio.get_running_loop().create_future()
+        self.orders[order_id] = {"symbol": symbol, "side": side, "quantity": quantity, "status": "queued"}
+        self._order_q.put_nowait((order_id, symbol, side, quantity, last_price, ticket))
+        return ticket
+
+    async def run_order_worker(self):
+        """Drains the order queue, sending everything queued so far concurrently."""
+        while True:
+            batch = [await self._order_q.get()]
+            while not self._order_q.empty():
+                batch.append(self._order_q.get_nowait())
+            results = await asyncio.gather(
+                *(self.place_order(symbol, side, quantity, last_price, order_id=order_id)
+                  for order_id, symbol, side, quantity, last_price, _ in batch),
+                return_exceptions=True
+            )
+            for (order_id, *_, ticket), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    self.orders[order_id]["status"] = "error"
+                    ticket.set_exception(result)
+                else:
+                    self.orders[order_id]["status"] = "placed" if result else "rejected"
+                    ticket.set_result(result)
+                self._order_q.task_done()
+
+class PublicAPIClient(HybridAPIClient):
+    """
+    Public for both market data and trading; no Alpaca credentials needed.
+    """
+
+    def __init__(self, public_api_key: str, public_secret_key: str, **kwargs):
+        kwargs.setdefault('timeframe', '1m')
+        super().__init__(None, None, public_api_key, public_secret_key, **kwargs)
+
+    async def _fetch_symbol(self, symbol: str, timeframe: str, limit: int) -> List[Candle]:
+        url = "https://api.public.com/marketdata/bars"
+        params = {"symbol": symbol, "timeframe": timeframe, "limit": limit}
+        r = await self._session.get(url, params=params, headers=self._auth_headers)
+        if r.status_code == 401:
+            await self._refresh_token_if_needed(r.status_code)
+            r = await self._session.get(url, params=params, headers=self._auth_headers)
+        if r.status_code == 404:
+            return []  # Unknown or untraded symbol; reported as missing rather than failing the batch
+        if r.status_code != 200:
+            raise ValueError(f"Failed to fetch candles: {r.status_code}, {r.text}")
+        # Public returns a list of {'open', 'high', 'low', 'close', 'volume', 'timestamp'}
+        return [Candle(**bar) for bar in orjson.loads(r.content)]
+
+    async def fetch_latest_candles(self, symbols: List[str], timeframe: str = '1m',
+                                   limit: int = 2) -> Dict[str, List[Candle]]:
+        """Fetches the latest bars from Public, one request per symbol sent concurrently."""
+        symbols = [s.upper() for s in symbols]
+        logger.debug("Fetching latest %s candles for %s from Public...", timeframe, symbols)
+        results = await asyncio.gather(*(self._fetch_symbol(s, timeframe, limit) for s in symbols))
+        out: Dict[str, List[Candle]] = {}
+        for symbol, bars in zip(symbols, results):
+            if bars:
+                self._cache_bars(symbol, timeframe, bars)
+                self.bar_store(symbol, timeframe).append(bars)
+                out[symbol] = bars
+        return out
+
+class CandleBreakoutStrategy:
+    def __init__(self, api_client: HybridAPIClient, symbol: str, quantity: int = 1):
+        self.api_client = api_client
+        self.symbol = symbol
+        self.quantity = quantity
+        self.position_size = 0
+        self._pending: asyncio.Future = None  # in-flight order ticket, if any
+        self.ohlc = np.empty((4, _RING_SIZE), dtype=np.float64)
+        self.ts = np.zeros(_RING_SIZE, dtype=np.int64)
+        self.head = 0  # total bars written; slot is head % _RING_SIZE
+        # Build both order bodies up front so a signal doesn't pay for them
+        for side in ('BUY', 'SELL'):
+            api_client.order_template(symbol, side)
+
+    def _push(self, bar: Candle):
+        i = self.head % _RING_SIZE
+        self.ohlc[:, i] = (bar.open, bar.high, bar.low, bar.close)
+        self.ts[i] = _to_epoch_s(bar.timestamp)
+        self.head += 1
+
+    def warm_up(self, n: int = 90):
+        """Seeds the ring with the last `n` stored bars in one HDF5 read, so a restart doesn't start flat."""
+        rows, t = self.api_client.bar_store(self.symbol, self.api_client.timeframe).tail(min(n, _RING_SIZE))
+        k = len(t)
+        if k == 0:
+            return
+        idx = (self.head + np.arange(k)) % _RING_SIZE
+        self.ohlc[:, idx] = rows[:, :4].T
+        self.ts[idx] = t
+        self.head += k
+
+    @property
+    def prev_high(self):
+        return self.ohlc[_H, (self.head - 1) % _RING_SIZE] if self.head else None
+
+    @property
+    def prev_low(self):
+        return self.ohlc[_L, (self.head - 1) % _RING_SIZE] if self.head else None
+
+    def _track(self, ticket: asyncio.Future, position_if_placed: int):
+        """Applies the position change once the queued order has been placed."""
+        self._pending = ticket
+
+        def _done(t: asyncio.Future):
+            self._pending = None
+            if t.cancelled():
+                return
+            if t.exception() is not None:
+                logger.error("Order error: %s", t.exception())
+            elif t.result():
+                self.position_size = position_if_placed
+
+        ticket.add_done_callback(_done)
+
+    @property
+    def warmed_up(self) -> bool:
+        """True once a previous bar is available to trade the next one against."""
+        return self.head > 0
+
+    def seed(self, bar: Candle):
+        """Pushes a completed history bar without trading on it, unless the ring already has it or a newer one."""
+        if self.head and self.ts[(self.head - 1) % _RING_SIZE] >= _to_epoch_s(bar.timestamp):
+            return
+        self._push(bar)
+
+    def on_new_candle(self, candle: Candle):
+        if not self.warmed_up:
+            self._push(candle)
+            return
+
+        # Hold off on new signals until the previous order has been acknowledged
+        if self._pending is None:
+            prev = (self.head - 1) % _RING_SIZE
+            ohlc = self.ohlc
+            close = candle.close
+            pos = self.position_size
+            signal = breakout_step(ohlc[_H, prev], ohlc[_L, prev], close, pos)
+            if signal:
+                submit = self.api_client.submit
+                if signal == 1:
+                    self._track(submit(self.symbol, 'BUY', self.quantity, close), self.quantity)
+                else:
+                    self._track(submit(self.symbol, 'SELL', pos, close), 0)
+
+        self._push(candle)
+
+class TradingContext:
+    def __init__(self, api_client: HybridAPIClient, strategies: List[CandleBreakoutStrategy]):
+        self.api_client = api_client
+        # One strategy per symbol; all symbols are fetched in a single request per bar
+        self.strategies = {s.symbol.upper(): s for s in strategies}
+        self.symbols = list(self.strategies)
+        self.portfolio = {"cash": 10000.0, "positions": {}}
+        self._no_data_until: Dict[str, float] = {}  # symbol -> monotonic time to ask again
+        logger.info("TradingContext initialized.")
+
+    def is_market_open(self) -> bool:
+        now = datetime.datetime.now(_EST)
+        if not _is_trading_day(now.date()):
+            return False
+        return _OPEN <= now.time() < _CLOSE
+
+    async def _fetch_with_retry(self, limit: int, symbols: List[str]) -> Dict[str, List[Candle]]:
+        """Retries transient network failures with exponential backoff instead of skipping the bar."""
+        for attempt in range(_RETRIES):
+            try:
+                return await self.api_client.fetch_latest_candles(symbols, self.api_client.timeframe, limit)
+            except (httpx.TimeoutException, httpx.NetworkError) as e:
+                if attempt == _RETRIES - 1:
+                    raise
+                logger.warning("Transient error fetching candles (attempt %d): %s", attempt + 1, e)
+                await asyncio.sleep(_BACKOFF_S * 2 ** attempt)
+
+    async def _warm_start(self):
+        """Seeds every strategy with the last completed bar, so the first live bar can already trade."""
+        bars = await self._fetch_with_retry(3, self.symbols)
+        for symbol, strategy in self.strategies.items():
+            candles = bars.get(symbol, [])
+            if len(candles) >= 2:
+                strategy.seed(candles[-2])
+
+    async def _poll_once(self):
+        now = time.monotonic()
+        symbols = [s for s in self.symbols if self._no_data_until.get(s, 0.0) <= now]
+        if not symbols:
+            return
+        bars = await self._fetch_with_retry(2, symbols)
+        for symbol in symbols:
+            candles = bars.get(symbol, [])
+            if len(candles) == 2:
+                self.strategies[symbol].on_new_candle(candles[-1])
+            elif not candles:
+                # Don't re-ask every bar for a symbol the feed has nothing for
+                self._no_data_until[symbol] = now + _NO_DATA_BACKOFF_S
+                logger.warning("No bars for %s; skipping it for %ds.", symbol, _NO_DATA_BACKOFF_S)
+            else:
+                logger.warning("Insufficient candles fetched for %s.", symbol)
+
+    async def run_trading_loop(self, interval_seconds: int = 60):
+        logger.info("Starting trading loop...")
+        try:
+            await self._warm_start()
+        except (httpx.TransportError, ValueError):
+            logger.exception("Warm start failed; the first live bar will seed instead")
+        order_worker = asyncio.create_task(self.api_client.run_order_worker())
+        try:
+            await self._trading_loop(interval_seconds)
+        finally:
+            order_worker.cancel()
+
+    async def _trading_loop(self, interval_seconds: int):
+        while True:
+            try:
+                if self.is_market_open():
+                    # Wake just after the bar closes instead of drifting by however long the last poll took
+                    await asyncio.sleep(_seconds_until_next_bar(interval_seconds))
+                    await self._poll_once()
+                else:
+                    wait_s = _seconds_until_open(datetime.datetime.now(_EST))
+                    logger.info("Market closed. Sleeping %.0fs until next open...", wait_s)
+                    await asyncio.sleep(wait_s)
+            # Errors skip only the current bar; the next pass already waits for the following boundary
+            except httpx.TransportError:
+                logger.exception("Network error persisted after %d attempts", _RETRIES)
+            except ValueError:
+                logger.exception("Alpaca/Public API returned an error")
+
+# Per-process settings every config in one run must agree on, with their defaults
+_SHARED_CONFIG = {"timeframe": "1Min", "broker": "alpaca", "order_type": "LIMIT", "secret_env": "PUBLIC_SECRET_KEY"}
+
+def _make_client(broker: str, timeframe: str, order_type: str, secret_env: str) -> HybridAPIClient:
+    if broker == "alpaca":
+        return HybridAPIClient(
+            alpaca_api_key=os.getenv("ALPACA_API_KEY"),
+            alpaca_secret_key=os.getenv("ALPACA_SECRET_KEY"),
+            public_api_key="your_public_api_key",
+            public_secret_key=os.getenv(secret_env),
+            timeframe=timeframe,
+            order_type=order_type
+        )
+    if broker == "public":
+        return PublicAPIClient(public_api_key="your_public_api_key", public_secret_key=os.getenv(secret_env),
+                               timeframe=timeframe, order_type=order_type)
+    raise ValueError(f"Unknown broker: {broker}")
+
+async def run_configs(configs: List[Dict[str, Any]]):
+    """
+    Trades every config from one process over a single shared API client.
+
+    Each config has `symbol` and optional `quantity` (1), `timeframe` ('1Min'), `broker` ('alpaca'),
+    `order_type` ('LIMIT' or 'MARKET') and `secret_env` (env var holding the Public secret,
+    'PUBLIC_SECRET_KEY'); configs run together must agree on everything but symbol and quantity.
+    """
+    shared = {key: configs[0].get(key, default) for key, default in _SHARED_CONFIG.items()}
+    if any(c.get(key, default) != shared[key] for c in configs for key, default in _SHARED_CONFIG.items()):
+        raise ValueError(f"Configs run in one process must share {', '.join(_SHARED_CONFIG)}")
+    timeframe = shared["timeframe"]
+    async with _make_client(**shared) as api_client:
+        strategies = []
+        for c in configs:
+            strategy = CandleBreakoutStrategy(api_client=api_client, symbol=c["symbol"], quantity=c.get("quantity", 1))
+            strategy.warm_up()
+            strategies.append(strategy)
+        trading_app = TradingContext(api_client=api_client, strategies=strategies)
+        await trading_app.run_trading_loop(_TIMEFRAME_S[timeframe])
+
+async def run(symbol: str, quantity: int = 1, timeframe: str = '1Min', broker: str = 'alpaca',
+              order_type: str = 'LIMIT', secret_env: str = 'PUBLIC_SECRET_KEY'):
+    await run_configs([{"symbol": symbol, "quantity": quantity, "timeframe": timeframe, "broker": broker,
+                        "order_type": order_type, "secret_env": secret_env}])
+
+def _load_config(path: str) -> Dict[str, Any]:
+    with open(path, 'rb') as f:
+        return tomllib.load(f)
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Long-only one-bar breakout trader.")
+    parser.add_argument("--config", nargs="+", required=True,
+                        help="TOML file(s) with symbol, quantity, timeframe, broker, order_type and secret_env; several share one client")
+    parser.add_argument("--log-file", default="long_breakout.log")
+    args = parser.parse_args(argv)
+    _configure_logging(args.log_file)
+    asyncio.run(run_configs([_load_config(path) for path in args.config]))
+
+if __name__ == "__main__":
+    main()
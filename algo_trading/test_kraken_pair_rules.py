@@ -0,0 +1,56 @@
+"""
+Shared pair-rules disk cache (kraken_pairs_cache) as the ZEC/ENA/AVAX bots use it: a cold
+start (no cache file) must fetch AssetPairs and write the cache; a warm start must be served
+from it without a fetch.
+
+Run with: python -m unittest test_kraken_pair_rules
+"""
+
+import importlib
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+import kraken_pairs_cache
+
+BOT_MODULES = ("kraken_LB1m_ZEC", "kraken_LB2m_ENA", "kraken_LB1m_AVAX")
+
+
+def _load(name):
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:  # bots need requests/websockets/dotenv installed
+        raise unittest.SkipTest(f"{name} not importable: {e}")
+
+
+class PairRulesCacheTest(unittest.TestCase):
+    def _rules(self, mod):
+        return mod.PairRules(
+            pair_key="XZECZUSD", altname="ZECUSD", ordermin=Decimal("0.01"), costmin=Decimal("0.5"),
+            lot_decimals=8, tick_size=Decimal("0.01"), quote="USD", base="ZEC", wsname="ZEC/USD",
+        )
+
+    def test_cache_miss_fetches_and_writes_then_hit_reads_back(self):
+        for name in BOT_MODULES:
+            with self.subTest(bot=name):
+                mod = _load(name)
+                with tempfile.TemporaryDirectory() as tmp:
+                    cache_file = os.path.join(tmp, "kraken_breakout", "pairs.json")
+                    expected = self._rules(mod)
+                    with mock.patch.object(kraken_pairs_cache, "PAIRS_CACHE_FILE", cache_file), \
+                         mock.patch.object(mod.KrakenClient, "_fetch_pair_rules", return_value=expected) as fetch:
+                        mod._pair_rules.cache_clear()
+                        self.assertEqual(mod._pair_rules("ZECUSD"), expected)  # cold start
+                        fetch.assert_called_once_with("ZECUSD")
+                        self.assertTrue(os.path.exists(cache_file))
+
+                        mod._pair_rules.cache_clear()
+                        self.assertEqual(mod._pair_rules("ZECUSD"), expected)  # served from disk
+                        fetch.assert_called_once()
+                    mod._pair_rules.cache_clear()
+
+
+if __name__ == "__main__":
+    unittest.main()